@@ -0,0 +1,69 @@
+"""
+Background batch writer for Trivia.NET
+
+Used by the event log and the score store to keep disk writes off the
+game loop. Producers put items on a queue; a writer thread hands them to
+write_batch() in lists of up to batch_size, at least every flush_seconds.
+A batch whose write fails is reported and dropped; the writer keeps going.
+"""
+
+import queue
+import sys
+import threading
+import time
+
+# Marks the end of the queue for the writer thread
+_STOP = object()
+
+
+def _run_batch_writer(items, write_batch, flush_seconds, batch_size, name):
+    batch = []
+    next_flush = time.monotonic() + flush_seconds
+    stopping = False
+
+    while not stopping:
+        try:
+            item = items.get(timeout=max(0.0, next_flush - time.monotonic()))
+            if item is _STOP:
+                stopping = True
+            else:
+                batch.append(item)
+        except queue.Empty:
+            pass
+
+        if batch and (stopping or len(batch) >= batch_size or time.monotonic() >= next_flush):
+            try:
+                write_batch(batch)
+            except Exception as e:
+                # Lose this batch rather than the writer: a dead writer
+                # would leave the queue growing and nothing written again
+                print(f"DEBUG: {name}: dropped a batch of {len(batch)} after a write error: {e}",
+                      file=sys.stderr)
+            batch = []
+
+        if time.monotonic() >= next_flush:
+            next_flush = time.monotonic() + flush_seconds
+
+
+def start_batch_writer(write_batch, flush_seconds, batch_size, name):
+    """
+    Start a writer thread. Returns (queue, thread); put items on the queue
+    and pass both to stop_batch_writer() when done.
+    """
+    items = queue.SimpleQueue()
+    writer = threading.Thread(
+        target=_run_batch_writer,
+        args=(items, write_batch, flush_seconds, batch_size, name),
+        name=name,
+        daemon=True
+    )
+    writer.start()
+    return items, writer
+
+
+def stop_batch_writer(items, writer):
+    """
+    Write out everything still queued and wait for the writer to exit.
+    """
+    items.put(_STOP)
+    writer.join()
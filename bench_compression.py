@@ -0,0 +1,91 @@
+"""
+Compression benchmark for LEADERBOARD/FINISHED broadcasts
+
+Builds the leaderboard text the server would send for N players over a
+number of rounds (random players scoring each round), then reports for
+each round's frame and the final FINISHED frame:
+- raw bytes on the wire
+- DEFLATE frame bytes with the stream context kept between frames
+  (what the server sends) and with a fresh stream per frame
+- CPU time to compress the frame once (the server shares one stream
+  across all compressing players) and what one stream per connection
+  would cost for the whole broadcast
+
+Usage:
+    python3 bench_compression.py [--players 1000 10000] [--rounds 10]
+"""
+
+import argparse
+import json
+import random
+import time
+
+from transport import deflate_frame, make_deflater
+
+
+def leaderboard_state(scores):
+    # Same ranking and text as server.generate_leaderboard_state()
+    ordered = sorted(scores.items(), key=lambda x: (-x[1], x[0]))
+    lines = []
+    current_rank = 1
+    prev_score = None
+    for i, (username, score) in enumerate(ordered):
+        if score != prev_score:
+            current_rank = i + 1
+        lines.append(f"{current_rank}. {username}: {score} {'point' if score == 1 else 'points'}")
+        prev_score = score
+    return "\n".join(lines)
+
+
+def encode(message):
+    return (json.dumps(message) + "\n").encode("utf-8")
+
+
+def run(num_players, rounds, level, rng):
+    scores = {f"Player{i}": 0 for i in range(num_players)}
+    frames = []
+    for _ in range(rounds):
+        for username in rng.sample(list(scores), num_players // 2):
+            scores[username] += 1
+        frames.append(encode({"message_type": "LEADERBOARD", "state": leaderboard_state(scores)}))
+    frames.append(encode({
+        "message_type": "FINISHED",
+        "final_standings": f"Final standings:\n{leaderboard_state(scores)}\nWinner: Player0"
+    }))
+
+    raw = sum(len(frame) for frame in frames)
+
+    deflater = make_deflater(level)
+    streamed = 0
+    cpu = 0.0
+    for frame in frames:
+        start = time.process_time()
+        streamed += len(deflate_frame(deflater, frame))
+        cpu += time.process_time() - start
+
+    fresh = sum(len(deflate_frame(make_deflater(level), frame)) for frame in frames)
+
+    per_frame_ms = cpu / len(frames) * 1000
+    print(f"{num_players:>6} players, level {level}: "
+          f"raw {raw / len(frames) / 1024:8.1f} KiB/frame, "
+          f"deflate {streamed / len(frames) / 1024:7.1f} KiB/frame ({streamed / raw:5.1%}), "
+          f"no context takeover {fresh / raw:5.1%}, "
+          f"CPU {per_frame_ms:6.2f} ms/frame shared, "
+          f"{per_frame_ms * num_players / 1000:7.2f} s/broadcast if per connection")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="LEADERBOARD/FINISHED compression benchmark")
+    parser.add_argument("--players", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--rounds", type=int, default=10)
+    parser.add_argument("--levels", type=int, nargs="+", default=[1, 6])
+    parser.add_argument("--seed", type=int, default=1112)
+    args = parser.parse_args()
+
+    for num_players in args.players:
+        for level in args.levels:
+            run(num_players, args.rounds, level, random.Random(args.seed))
+
+
+if __name__ == "__main__":
+    main()
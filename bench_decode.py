@@ -0,0 +1,163 @@
+"""
+Fuzz/throughput benchmark for the message decoding layer (protocol.py)
+
+Offline (default): decodes batches of valid, garbage and hostile lines
+and reports lines/s through decode_message() next to the old decode
+(json.loads on everything) for each kind of input. Every line must be
+either accepted or rejected with MessageError; anything else is a bug
+and fails the run.
+
+Live (--port): connects players that send HI and then flood a running
+server with garbage from the first QUESTION on, and reports how many
+lines each one got in before the server dropped it. Run loadgen.py
+against the same server to check that well-behaved players still get
+their RESULTs.
+
+Usage:
+    python3 bench_decode.py [--lines 20000] [--seed 1112]
+    python3 bench_decode.py --port 7777 --attackers 5
+"""
+
+import argparse
+import json
+import random
+import socket
+import sys
+import threading
+import time
+
+from protocol import MAX_MESSAGE_BYTES, MessageError, decode_message
+
+GAME_TYPES = ("ANSWER", "BYE")
+
+
+def make_cases(rng):
+    """
+    kind -> function returning one random line of that kind
+    """
+    def random_bytes():
+        return bytes(rng.getrandbits(8) for _ in range(rng.randint(1, 200))).replace(b"\n", b"")
+
+    def mutated_answer():
+        line = bytearray(json.dumps({"message_type": "ANSWER", "answer": str(rng.randint(0, 999))}).encode())
+        for _ in range(rng.randint(1, 4)):
+            line[rng.randrange(len(line))] = rng.getrandbits(8)
+        return bytes(line).replace(b"\n", b"")
+
+    return {
+        "valid ANSWER": lambda: json.dumps({"message_type": "ANSWER", "answer": str(rng.randint(0, 999))}).encode(),
+        "random bytes": random_bytes,
+        "mutated ANSWER": mutated_answer,
+        "wrong type": lambda: json.dumps({"message_type": rng.choice(["HI", "QUESTION", "NOPE"]),
+                                          "username": "x" * rng.randint(1, 50)}).encode(),
+        "type in a string": lambda: json.dumps({"message_type": 1,
+                                                "answer": '"message_type": "ANSWER"'}).encode(),
+        "bad answer field": lambda: json.dumps({"message_type": "ANSWER",
+                                                "answer": rng.choice([None, 1, [], {}])}).encode(),
+        "deep nesting": lambda: b'{"message_type": "ANSWER", "answer": ' + b"[" * 2000 + b"]" * 2000 + b"}",
+        "oversized": lambda: json.dumps({"message_type": "ANSWER", "answer": "9" * (MAX_MESSAGE_BYTES * 16)}).encode(),
+    }
+
+
+def old_decode(line):
+    # What handle_player_answer did before protocol.py
+    try:
+        message = json.loads(line.decode("utf-8"))
+        return message.get("message_type") in GAME_TYPES
+    except Exception:
+        return False
+
+
+def run_offline(count, seed):
+    rng = random.Random(seed)
+    failed = False
+
+    for kind, make_line in make_cases(rng).items():
+        lines = [make_line() for _ in range(count)]
+
+        accepted = 0
+        start = time.perf_counter()
+        for line in lines:
+            try:
+                decode_message(line, GAME_TYPES)
+                accepted += 1
+            except MessageError:
+                pass
+            except Exception as e:
+                print(f"FAIL: {kind}: {type(e).__name__} escaped decode_message: {e}", file=sys.stderr)
+                failed = True
+                break
+        new_rate = count / (time.perf_counter() - start)
+
+        start = time.perf_counter()
+        for line in lines:
+            old_decode(line)
+        old_rate = count / (time.perf_counter() - start)
+
+        print(f"{kind:>17}: {accepted:>6}/{count} accepted, "
+              f"{new_rate / 1000:8.1f}k lines/s (old decode {old_rate / 1000:8.1f}k lines/s)")
+
+    return failed
+
+
+def flood(host, port, username, seed, results, results_lock):
+    rng = random.Random(seed)
+    cases = list(make_cases(rng).values())[1:]
+    sent = 0
+    started = None
+    try:
+        sock = socket.create_connection((host, port))
+        sock.sendall((json.dumps({"message_type": "HI", "username": username}) + "\n").encode())
+        buffer = b""
+        while b'"QUESTION"' not in buffer:
+            chunk = sock.recv(4096)
+            if not chunk:
+                raise ConnectionError("closed before the first QUESTION")
+            buffer += chunk
+
+        started = time.monotonic()
+        while True:
+            sock.sendall(rng.choice(cases)() + b"\n")
+            sent += 1
+    except OSError as e:
+        outcome = f"dropped after {sent} lines" if started else f"failed: {e}"
+    elapsed = time.monotonic() - started if started else 0.0
+
+    with results_lock:
+        results.append((username, outcome, elapsed))
+
+
+def run_live(host, port, attackers, seed):
+    results = []
+    results_lock = threading.Lock()
+    threads = [
+        threading.Thread(target=flood, args=(host, port, f"Fuzz{i}", seed + i, results, results_lock))
+        for i in range(attackers)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    for username, outcome, elapsed in sorted(results):
+        print(f"{username}: {outcome} ({elapsed * 1000:.1f} ms)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Message decoding fuzz/throughput benchmark")
+    parser.add_argument("--lines", type=int, default=20000, help="lines per kind of input (offline)")
+    parser.add_argument("--seed", type=int, default=1112)
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, help="flood a running server instead")
+    parser.add_argument("--attackers", type=int, default=5, help="flooding players (with --port)")
+    args = parser.parse_args()
+
+    if args.port is not None:
+        run_live(args.host, args.port, args.attackers, args.seed)
+        return
+
+    sys.exit(1 if run_offline(args.lines, args.seed) else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Cold-start benchmark for client.py
+
+Imports client.py in fresh interpreters with -X importtime and checks
+that the import stays within a time budget and that no mode specific
+module (requests, questions) is loaded up front.
+
+Usage:
+    python3 bench_startup.py [--budget-ms 60] [--runs 5]
+
+Exits with status 1 if the budget is exceeded (--budget-ms 0 checks only
+the imports) or a mode specific module is imported.
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+
+# Loaded on demand by the modes that need them
+LAZY_MODULES = ("requests", "questions")
+
+
+def measure_import(module):
+    """
+    Import module in a fresh interpreter. Returns (cumulative import time
+    in microseconds, {imported module name: cumulative microseconds}).
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        capture_output=True,
+        text=True,
+        check=True
+    )
+
+    imports = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        imports[name.strip()] = int(cumulative)
+
+    return imports[module], imports
+
+
+def main():
+    parser = argparse.ArgumentParser(description="client.py cold-start benchmark")
+    parser.add_argument("--budget-ms", type=float, default=60.0)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    timings = []
+    for _ in range(args.runs):
+        total, imports = measure_import("client")
+        timings.append(total)
+
+    best = min(timings) / 1000
+    budget = f"budget {args.budget_ms:.1f} ms" if args.budget_ms else "no budget"
+    print(f"client import: best {best:.1f} ms, worst {max(timings) / 1000:.1f} ms "
+          f"over {args.runs} runs ({budget})")
+
+    slowest = sorted(imports.items(), key=lambda item: item[1], reverse=True)[1:6]
+    for name, cumulative in slowest:
+        print(f"  {name}: {cumulative / 1000:.1f} ms")
+
+    failed = False
+    for name in LAZY_MODULES:
+        if name in imports:
+            print(f"FAIL: {name} is imported at startup", file=sys.stderr)
+            failed = True
+    if args.budget_ms and best > args.budget_ms:
+        print(f"FAIL: cold start {best:.1f} ms is over the {args.budget_ms:.1f} ms budget", file=sys.stderr)
+        failed = True
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
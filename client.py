@@ -10,18 +10,22 @@
 
 
 import json
+import os
 import socket
 import sys
 import threading
 import select
 import time
 
-import requests
-
-from pathlib import Path
 from typing import Any, Literal
 
-from questions import *
+from transport import COMPRESSION, inflate_frame, make_inflater, set_low_latency
+
+# Mode specific modules (questions for "auto", requests for "ai") are
+# imported on first use so bot clients start fast
+
+CLIENT_MODES = ("you", "auto", "ai")
+OLLAMA_FIELDS = ("ollama_host", "ollama_port", "ollama_model")
 
 config = {}
 client_socket = None
@@ -29,6 +33,14 @@ connected: bool = False
 current_time_limit: int = 0
 current_question_type = ""
 server_thread = None
+ai_session = None
+# Decompresses DEFLATE frames when "compression" is on in the config
+inflater = None
+# Local copy of the scores, kept up to date by LEADERBOARD_DELTA messages
+# when "leaderboard_deltas" is on in the config
+standings = {"scores": {}, "points_nouns": ["point", "points"]}
+# question type -> solver, filled on first use and shared by all sessions
+solvers = {}
 
 
 def encode_message(message: dict[str, Any]) -> bytes:
@@ -39,6 +51,33 @@ def decode_message(message: bytes) -> dict[str, Any]:
     return json.loads(message.decode('utf-8').strip())
 
 
+def apply_leaderboard_delta(standings: dict[str, Any], message: dict[str, Any]) -> str:
+    """
+    Update a local standings model from a LEADERBOARD_DELTA message and
+    return the leaderboard text the server would have sent in LEADERBOARD.
+    """
+    scores = standings["scores"]
+    if message.get("snapshot"):
+        scores.clear()
+        standings["points_nouns"] = message["points_nouns"]
+    for username in message.get("removed", []):
+        scores.pop(username, None)
+    scores.update(message.get("changes", {}))
+
+    # Same ranking as the server: ties share the rank of their first player
+    singular, plural = standings["points_nouns"]
+    lines = []
+    current_rank = 1
+    prev_score = None
+    for i, (username, score) in enumerate(sorted(scores.items(), key=lambda x: (-x[1], x[0]))):
+        if score != prev_score:
+            current_rank = i + 1
+        lines.append(f"{current_rank}. {username}: {score} {singular if score == 1 else plural}")
+        prev_score = score
+
+    return "\n".join(lines)
+
+
 def send_message(client_socket, data: dict[str, Any]):
     # Use encode_message
     client_socket.sendall(encode_message(data))
@@ -58,13 +97,17 @@ def receive_message(socket_socket) -> dict[str, Any] | None:
     if not data.strip():
         return None
 
-    return decode_message(data)
+    message = decode_message(data)
+    if message.get("message_type") == "DEFLATE" and inflater is not None:
+        message = decode_message(inflate_frame(inflater, message))
+    return message
 
 
 def connect(hostname: str, port: int) -> socket.socket:
 
     try:
         sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        set_low_latency(sock)
         sock.connect((hostname, port))
         return sock
     except Exception:
@@ -121,15 +164,33 @@ def answer_question(
 
 
 def solve_question_auto(question_type: str, short_question: str) -> str:
-    solver = get_solver(question_type)
-    return solver(short_question)
+    if question_type not in solvers:
+        from questions import get_solver
+        solvers[question_type] = get_solver(question_type)
+    return solvers[question_type](short_question)
+
 
-def answer_question_ollama(question: str) -> str:
+def get_ai_session():
+    # requests takes longer to import than the rest of the client put
+    # together, so only "ai" clients ever load it
+    global ai_session
+
+    if ai_session is None:
+        import requests
+        ai_session = requests.Session()
+    return ai_session
+
+
+def answer_question_ollama(question: str, time_limit: float | None = None) -> str:
 
 
 
     global config, current_time_limit
 
+    import requests
+
+    if time_limit is None:
+        time_limit = current_time_limit
 
     try:
         ollama_config = config["ollama_config"]
@@ -146,7 +207,7 @@ def answer_question_ollama(question: str) -> str:
             "stream": False
         }
 
-        response = requests.post(url, json=payload, timeout=current_time_limit)
+        response = get_ai_session().post(url, json=payload, timeout=time_limit)
 
         if response.status_code != 200:
             return ""
@@ -171,7 +232,7 @@ def answer_question_ollama(question: str) -> str:
 def handle_command(command: str):
 
 
-    global client_socket, connected, server_thread
+    global client_socket, connected, server_thread, inflater
 
     if command == "EXIT":
         if connected and client_socket:
@@ -197,6 +258,11 @@ def handle_command(command: str):
                         "message_type": "HI",
                         "username": config["username"]
                     }
+                    if config.get("compression"):
+                        inflater = make_inflater()
+                        hi_msg["compression"] = COMPRESSION
+                    if config.get("leaderboard_deltas"):
+                        hi_msg["leaderboard_deltas"] = True
                     send_message(client_socket, hi_msg)
 
                     server_thread = threading.Thread(target=handle_server_messages, daemon=False)
@@ -250,6 +316,10 @@ def handle_received_message(message: dict[str, Any]):
         print(message["state"])
         sys.stdout.flush()
 
+    elif msg_type == "LEADERBOARD_DELTA":
+        print(apply_leaderboard_delta(standings, message))
+        sys.stdout.flush()
+
     elif msg_type == "FINISHED":
         print(message["final_standings"])
         sys.stdout.flush()  # Ensure output is written
@@ -290,6 +360,177 @@ def handle_server_messages():
         return
 
 
+def validate_config(config) -> str | None:
+    """
+    Check a loaded client config; returns an error message or None.
+    """
+    if not isinstance(config, dict):
+        return "client.py: Invalid configuration"
+
+    username = config.get("username")
+    if not isinstance(username, str) or not username.isalnum():
+        return "client.py: Invalid username in configuration"
+
+    if config.get("client_mode") not in CLIENT_MODES:
+        return f"client.py: client_mode must be one of {', '.join(CLIENT_MODES)}"
+
+    if config["client_mode"] == "ai":
+        ollama_config = config.get("ollama_config")
+        if not isinstance(ollama_config, dict) or any(field not in ollama_config for field in OLLAMA_FIELDS):
+            return "client.py: Missing values for Ollama configuration"
+
+    return None
+
+
+def expand_sessions(config) -> list[dict[str, Any]]:
+    """
+    Turn the "sessions" list of a multi-bot config into one dict per bot.
+    Each entry has a "server" ("host:port"), a "client_mode" and either a
+    "username" or a list of "usernames" sharing that mode and server.
+    Raises ValueError describing the first invalid entry.
+    """
+    sessions = []
+    entries = config.get("sessions")
+    if not isinstance(entries, list) or not entries:
+        raise ValueError("sessions must be a non-empty list")
+
+    for entry in entries:
+        if not isinstance(entry, dict):
+            raise ValueError(f"invalid session {entry!r}; each session must be an object")
+        usernames = entry.get("usernames", [entry.get("username")])
+        if not isinstance(usernames, list) or not usernames:
+            raise ValueError(f"session usernames must be a non-empty list, not {usernames!r}")
+        if entry.get("client_mode") not in ("auto", "ai"):
+            raise ValueError("session client_mode must be auto or ai")
+
+        host, _, port = str(entry.get("server", "")).rpartition(":")
+        if not host or not port.isdigit():
+            raise ValueError(f"invalid server '{entry.get('server')}' in sessions")
+
+        for username in usernames:
+            if not isinstance(username, str) or not username.isalnum():
+                raise ValueError(f"invalid username {username!r} in sessions")
+            sessions.append({
+                "username": username,
+                "client_mode": entry["client_mode"],
+                "host": host,
+                "port": int(port),
+                "compression": bool(entry.get("compression", config.get("compression"))),
+                "leaderboard_deltas": bool(entry.get("leaderboard_deltas", config.get("leaderboard_deltas"))),
+                "standings": {"scores": {}, "points_nouns": ["point", "points"]},
+                "time_limit": 0
+            })
+
+    if any(session["client_mode"] == "ai" for session in sessions):
+        ollama_config = config.get("ollama_config")
+        if not isinstance(ollama_config, dict) or any(field not in ollama_config for field in OLLAMA_FIELDS):
+            raise ValueError("Missing values for Ollama configuration")
+
+    return sessions
+
+
+def print_session(session, text):
+    prefix = f"[{session['username']}] "
+    print("\n".join(prefix + line for line in text.split("\n")))
+
+
+async def answer_session_question(session, message, ai_pool) -> str:
+    if session["client_mode"] == "auto":
+        try:
+            return solve_question_auto(message["question_type"], message["short_question"])
+        except Exception:
+            return ""
+
+    # The AI backend is blocking HTTP, so run it on the shared pool
+    import asyncio
+    return await asyncio.get_running_loop().run_in_executor(
+        ai_pool, answer_question_ollama, message["trivia_question"], session["time_limit"]
+    )
+
+
+async def run_session(session, ai_pool):
+    """
+    Play one bot's game on the shared event loop: the same messages and
+    output as a single client, with each line prefixed by the username.
+    """
+    import asyncio
+
+    try:
+        reader, writer = await asyncio.open_connection(session["host"], session["port"])
+    except OSError:
+        print_session(session, "Connection failed")
+        return
+
+    hi_msg = {"message_type": "HI", "username": session["username"]}
+    session_inflater = None
+    if session["compression"]:
+        session_inflater = make_inflater()
+        hi_msg["compression"] = COMPRESSION
+    if session["leaderboard_deltas"]:
+        hi_msg["leaderboard_deltas"] = True
+    writer.write(encode_message(hi_msg))
+
+    try:
+        while True:
+            line = await reader.readline()
+            if not line.strip():
+                break
+            message = decode_message(line)
+            if message.get("message_type") == "DEFLATE" and session_inflater is not None:
+                message = decode_message(inflate_frame(session_inflater, message))
+            msg_type = message.get("message_type")
+
+            if msg_type == "READY":
+                print_session(session, message["info"])
+
+            elif msg_type == "QUESTION":
+                print_session(session, message["trivia_question"])
+                session["time_limit"] = message["time_limit"]
+                answer = await answer_session_question(session, message, ai_pool)
+                if answer:
+                    writer.write(encode_message({"message_type": "ANSWER", "answer": answer}))
+
+            elif msg_type == "RESULT":
+                print_session(session, message["feedback"])
+
+            elif msg_type == "LEADERBOARD":
+                print_session(session, message["state"])
+
+            elif msg_type == "LEADERBOARD_DELTA":
+                print_session(session, apply_leaderboard_delta(session["standings"], message))
+
+            elif msg_type == "FINISHED":
+                print_session(session, message["final_standings"])
+                break
+    except (OSError, ValueError):
+        pass
+    finally:
+        writer.close()
+        sys.stdout.flush()
+
+
+def run_sessions(sessions, ai_workers=4):
+    """
+    Run many bot sessions in this process on one asyncio event loop.
+    AI sessions share one thread pool and one HTTP session.
+    """
+    import asyncio
+
+    ai_pool = None
+    if any(session["client_mode"] == "ai" for session in sessions):
+        from concurrent.futures import ThreadPoolExecutor
+        ai_pool = ThreadPoolExecutor(max_workers=ai_workers, thread_name_prefix="ai")
+
+    async def run_all():
+        await asyncio.gather(*(run_session(session, ai_pool) for session in sessions))
+
+    try:
+        asyncio.run(run_all())
+    finally:
+        if ai_pool:
+            ai_pool.shutdown(wait=False)
+
+
 def main():
     global config
 
@@ -306,17 +547,46 @@ def main():
         print("client.py: Configuration not provided", file=sys.stderr)
         sys.exit(1)
 
-    if not Path(config_path).exists():
+    if not os.path.exists(config_path):
         print(f"client.py: File {config_path} does not exist", file=sys.stderr)
         sys.exit(1)
 
-    with open(config_path) as f:
-        config = json.load(f)
+    try:
+        with open(config_path) as f:
+            config = json.load(f)
+    except json.JSONDecodeError:
+        print("client.py: Invalid JSON in config file", file=sys.stderr)
+        sys.exit(1)
 
-    if config.get("client_mode") == 'ai':
-        if not config.get("ollama_config"):
-            print("client.py: Missing values for Ollama configuration", file=sys.stderr)
+    if isinstance(config, dict) and "sessions" in config:
+        # Multi-bot mode: every session connects straight away
+        try:
+            sessions = expand_sessions(config)
+        except ValueError as e:
+            print(f"client.py: {e}", file=sys.stderr)
+            sys.exit(1)
+        modes = {session["client_mode"] for session in sessions}
+    else:
+        error = validate_config(config)
+        if error:
+            print(error, file=sys.stderr)
             sys.exit(1)
+        sessions = None
+        modes = {config["client_mode"]}
+
+    if "ai" in modes:
+        try:
+            get_ai_session()
+        except ImportError:
+            print("client.py: The requests package is required for ai mode", file=sys.stderr)
+            sys.exit(1)
+
+    if sessions is not None:
+        try:
+            run_sessions(sessions, config.get("ai_workers", 4))
+        except KeyboardInterrupt:
+            pass
+        sys.exit(0)
 
     try:
         while True:
@@ -0,0 +1,276 @@
+"""
+Server configuration loading and hot reload for Trivia.NET
+
+load_config() reads and validates a config file and returns it as an
+immutable snapshot: a read-only mapping, with lists turned into tuples
+and nested objects into read-only mappings. A snapshot never changes
+once made, so the game loop reads it without any locking.
+
+start_config_watcher() reloads the file when its modification time
+changes or the process gets SIGHUP. A reload that fails validation is
+reported and ignored; a good one replaces the snapshot that
+current_config() returns. The server takes current_config() at the start
+of every game, so a game in progress keeps the config it started with
+and the next game gets the new one.
+
+Settings used when the server starts (RESTART_FIELDS) can't change while
+it runs; a reload that changes them keeps the old values and says so.
+"""
+
+import json
+import os
+import signal
+import sys
+import threading
+from types import MappingProxyType
+
+from questions import get_generator
+
+REQUIRED_FIELDS = [
+    "port", "players", "question_types", "question_formats",
+    "question_seconds", "question_interval_seconds", "ready_info",
+    "question_word", "correct_answer", "incorrect_answer",
+    "points_noun_singular", "points_noun_plural",
+    "final_standings_heading", "one_winner", "multiple_winners"
+]
+
+# Only read when the server starts
+RESTART_FIELDS = ("port", "listen_backlog", "event_log", "event_log_flush_seconds",
+                  "event_log_batch_size", "score_store", "profile")
+
+DEFAULT_POLL_SECONDS = 1.0
+
+# Optional numbers: field -> (whole numbers only, smallest, largest or None)
+NUMBER_FIELDS = {
+    "games": (True, 0, None),
+    "early_close_fraction": (False, 0, 1),
+    "early_close_grace_seconds": (False, 0, None),
+    "compression_threshold_bytes": (True, 0, None),
+    "leaderboard_snapshot_rounds": (True, 1, None),
+    "error_budget": (True, 0, None),
+    "max_message_bytes": (True, 1, None),
+    "handshake_timeout_seconds": (False, 0, None),
+    "max_connections_per_ip": (True, 1, None),
+    "max_spectators": (True, 0, None),
+    "max_pending_handshakes": (True, 1, None),
+    "spectator_backlog_bytes": (True, 1, None),
+    "listen_backlog": (True, 0, None),
+    "event_log_flush_seconds": (False, 0, None),
+    "event_log_batch_size": (True, 1, None),
+    "profile_sample_interval_seconds": (False, 0, None),
+    "config_poll_seconds": (False, 0, None),
+}
+BOOL_FIELDS = ("compensate_send_skew", "compression", "leaderboard_deltas", "spectators",
+               "profile_allocations")
+TEXT_FIELDS = ("question_word", "points_noun_singular", "points_noun_plural",
+               "final_standings_heading", "event_log", "profile")
+RESULT_DELIVERIES = ("immediate", "batched")
+
+# Templates and example arguments they have to format with
+TEMPLATES = {
+    "ready_info": ((), {"question_interval_seconds": 1}),
+    "correct_answer": ((), {"answer": "1", "correct_answer": "1"}),
+    "incorrect_answer": ((), {"answer": "1", "correct_answer": "2"}),
+    "one_winner": (("player",), {}),
+    "multiple_winners": (("player, player",), {}),
+}
+
+_config = None
+_path = None
+_mtime = None
+_reload_requested = threading.Event()
+_watcher_stop = threading.Event()
+_watcher = None
+
+
+class ConfigError(ValueError):
+    pass
+
+
+def freeze(value):
+    if isinstance(value, dict):
+        return MappingProxyType({key: freeze(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return tuple(freeze(item) for item in value)
+    return value
+
+
+def validate_config(config):
+    """
+    Raise ConfigError if config can't be used to run a game: besides the
+    required fields, every optional setting that is given must have the
+    right type and range and every template must format, so a bad reload
+    is turned away here rather than failing in the middle of a game.
+    """
+    for field in REQUIRED_FIELDS:
+        if field not in config:
+            raise ConfigError(f"Missing required field '{field}' in config")
+
+    if not isinstance(config["players"], int) or config["players"] < 1:
+        raise ConfigError("'players' must be a positive whole number")
+    for field in ("question_seconds", "question_interval_seconds"):
+        if not isinstance(config[field], (int, float)) or config[field] < 0:
+            raise ConfigError(f"'{field}' must be a number of seconds")
+    if config["question_seconds"] == 0:
+        raise ConfigError("'question_seconds' must be more than 0")
+
+    if not isinstance(config["question_types"], list) or not config["question_types"]:
+        raise ConfigError("'question_types' must be a list of question types")
+    for question_type in config["question_types"]:
+        try:
+            get_generator(question_type)
+        except (KeyError, TypeError):
+            raise ConfigError(f"Unknown question type {question_type!r}") from None
+
+    if not isinstance(config["question_formats"], dict):
+        raise ConfigError("'question_formats' must map question types to formats")
+    for question_type, question_format in config["question_formats"].items():
+        check_template(f"question_formats/{question_type}", question_format, ("question",), {})
+    for field, (args, kwargs) in TEMPLATES.items():
+        check_template(field, config[field], args, kwargs)
+
+    for field, (whole, smallest, largest) in NUMBER_FIELDS.items():
+        if config.get(field) is None:
+            continue
+        value = config[field]
+        if (isinstance(value, bool) or not isinstance(value, int if whole else (int, float))
+                or value < smallest or (largest is not None and value > largest)):
+            kind = "a whole number" if whole else "a number"
+            bounds = f"from {smallest} to {largest}" if largest is not None else f"of at least {smallest}"
+            raise ConfigError(f"'{field}' must be {kind} {bounds}")
+    for field in BOOL_FIELDS:
+        if field in config and not isinstance(config[field], bool):
+            raise ConfigError(f"'{field}' must be true or false")
+    for field in TEXT_FIELDS:
+        if field in config and not isinstance(config[field], str):
+            raise ConfigError(f"'{field}' must be a string")
+
+    if config.get("result_delivery") not in (None,) + RESULT_DELIVERIES:
+        raise ConfigError(f"'result_delivery' must be one of {', '.join(RESULT_DELIVERIES)}")
+    if isinstance(config.get("seed"), bool) or not isinstance(config.get("seed"), (int, str, type(None))):
+        raise ConfigError("'seed' must be a whole number or a string")
+    if "score_store" in config and not isinstance(config["score_store"], dict):
+        raise ConfigError("'score_store' must be an object")
+
+
+def check_template(field, template, args, kwargs):
+    """
+    Raise ConfigError unless template is a string that formats with the
+    arguments the server will give it.
+    """
+    if not isinstance(template, str):
+        raise ConfigError(f"'{field}' must be a string")
+    try:
+        template.format(*args, **kwargs)
+    except (IndexError, KeyError, ValueError, AttributeError, TypeError) as e:
+        raise ConfigError(f"'{field}' is not a valid template: {type(e).__name__}: {e}") from None
+
+
+def load_config(path):
+    """
+    Read, validate and freeze the config at path. Raises ConfigError.
+    """
+    try:
+        with open(path) as f:
+            config = json.load(f)
+    except json.JSONDecodeError:
+        raise ConfigError("Invalid JSON in config file") from None
+    except Exception as e:
+        raise ConfigError(f"Error loading config: {e}") from None
+
+    if not isinstance(config, dict):
+        raise ConfigError("Invalid JSON in config file")
+    validate_config(config)
+    return freeze(config)
+
+
+def current_config():
+    return _config
+
+
+def set_config(path, config):
+    """
+    Use an already loaded snapshot; later reloads read path.
+    """
+    global _config, _path, _mtime
+
+    _config = config
+    _path = path
+    try:
+        _mtime = os.stat(path).st_mtime_ns
+    except OSError:
+        _mtime = None
+
+
+def reload_config():
+    """
+    Load the config file again and swap it in if it is valid.
+    Returns True if the snapshot changed.
+    """
+    global _config
+
+    try:
+        config = load_config(_path)
+    except ConfigError as e:
+        print(f"DEBUG: Config reload failed, keeping the current config: {e}", file=sys.stderr)
+        return False
+
+    changed = [field for field in RESTART_FIELDS if config.get(field) != _config.get(field)]
+    if changed:
+        print(f"DEBUG: Config reload: {', '.join(changed)} only change on restart", file=sys.stderr)
+        config = freeze({**config, **{field: _config[field] for field in changed if field in _config}})
+
+    if config == _config:
+        return False
+    _config = config
+    print("DEBUG: Config reloaded; the next game uses it", file=sys.stderr)
+    return True
+
+
+def _watch(poll_seconds):
+    global _mtime
+
+    while not _watcher_stop.is_set():
+        _reload_requested.wait(poll_seconds or None)
+        if _watcher_stop.is_set():
+            return
+        signalled = _reload_requested.is_set()
+        _reload_requested.clear()
+
+        try:
+            mtime = os.stat(_path).st_mtime_ns
+        except OSError:
+            mtime = None
+        if signalled or mtime != _mtime:
+            _mtime = mtime
+            reload_config()
+
+
+def _request_reload(signum, frame):
+    _reload_requested.set()
+
+
+def start_config_watcher(poll_seconds=DEFAULT_POLL_SECONDS):
+    """
+    Reload on SIGHUP and, if poll_seconds is set, whenever the file's
+    modification time changes. Call from the main thread (signals).
+    """
+    global _watcher
+
+    if hasattr(signal, "SIGHUP"):
+        signal.signal(signal.SIGHUP, _request_reload)
+
+    _watcher_stop.clear()
+    _watcher = threading.Thread(target=_watch, args=(poll_seconds,), name="config-watcher", daemon=True)
+    _watcher.start()
+
+
+def stop_config_watcher():
+    global _watcher
+
+    if _watcher is None:
+        return
+    _watcher_stop.set()
+    _reload_requested.set()
+    _watcher.join()
+    _watcher = None
@@ -0,0 +1,101 @@
+"""
+Game event log for Trivia.NET
+
+Records what happened in a game as JSON lines so it can be analysed or
+replayed later (see replay.py). Every line has:
+- "game": id of the game the event belongs to
+- "t": seconds since the game began (time.monotonic based)
+- "event": connect, evict, spectate, spectator_drop, game_start, ready,
+  question, answer, disconnect or game_end
+plus event specific fields.
+
+log_event() only stamps the event and puts it on a queue. A writer
+thread serialises and writes events in batches, so the game loop never
+waits on the disk.
+"""
+
+import json
+import time
+
+from batching import start_batch_writer, stop_batch_writer
+
+DEFAULT_FLUSH_SECONDS = 0.5
+DEFAULT_BATCH_SIZE = 256
+
+_events = None
+_writer = None
+_log_file = None
+_game_id = None
+_game_start = 0.0
+
+
+def _write_events(batch):
+    _log_file.write("".join(
+        json.dumps({"game": game_id, "t": round(t, 6), "event": event, **fields},
+                   separators=(",", ":")) + "\n"
+        for game_id, t, event, fields in batch
+    ))
+    _log_file.flush()
+
+
+def start_event_log(path, flush_seconds=DEFAULT_FLUSH_SECONDS, batch_size=DEFAULT_BATCH_SIZE):
+    global _events, _writer, _log_file
+
+    _log_file = open(path, "a", encoding="utf-8")
+    _events, _writer = start_batch_writer(_write_events, flush_seconds, batch_size, "event-log")
+
+
+def begin_game():
+    """
+    Start a new game: later events get a fresh game id and their times
+    are measured from now.
+    """
+    global _game_id, _game_start
+
+    _game_start = time.monotonic()
+    _game_id = f"{int(time.time() * 1000)}"
+    return _game_id
+
+
+def log_event(event, **fields):
+    if _events is None:
+        return
+    _events.put((_game_id, time.monotonic() - _game_start, event, fields))
+
+
+def stop_event_log():
+    """
+    Write out everything still queued and stop the writer thread.
+    """
+    global _events, _writer, _log_file
+
+    if _events is None:
+        return
+    stop_batch_writer(_events, _writer)
+    _log_file.close()
+    _events = None
+    _writer = None
+    _log_file = None
+
+
+def read_events(path, game_id=None):
+    """
+    Load the events of one game from a log file.
+    Defaults to the last game in the file.
+    """
+    games = {}
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            event = json.loads(line)
+            games.setdefault(event["game"], []).append(event)
+
+    if not games:
+        raise ValueError(f"no games in {path}")
+    if game_id is None:
+        game_id = list(games)[-1]
+    if game_id not in games:
+        raise ValueError(f"game {game_id} not found in {path}")
+
+    return games[game_id]
@@ -0,0 +1,244 @@
+"""
+Load generator for Trivia.NET
+
+Connects many bot players to a running server and reports how long
+each stage of the game took from the players' side:
+1. connect: TCP connect time
+2. admission: HI sent -> READY received
+3. answer: ANSWER sent -> RESULT received
+
+Idle connections that never send HI can be opened first to simulate a
+connection storm against the server's admission pipeline.
+
+Spectators (SPECTATE) can be connected first too; they are all read by
+one thread, and their lag is how long after the first bot each
+spectator got each QUESTION.
+
+Usage:
+    python3 loadgen.py --port 7777 --players 50 [--idle 20] [--spectators 1000] [--mode auto]
+"""
+
+import argparse
+import json
+import selectors
+import socket
+import statistics
+import sys
+import threading
+import time
+
+from questions import get_solver
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(fraction * len(ordered)))
+    return ordered[index]
+
+
+def summarise(name, values):
+    if not values:
+        print(f"{name:<10} n=0")
+        return
+    print(f"{name:<10} n={len(values):<6} "
+          f"median={statistics.median(values) * 1000:8.2f} ms  "
+          f"p95={percentile(values, 0.95) * 1000:8.2f} ms  "
+          f"max={max(values) * 1000:8.2f} ms")
+
+
+def send_json(sock, message):
+    sock.sendall((json.dumps(message) + "\n").encode('utf-8'))
+
+
+def run_bot(host, port, username, mode, stats, stats_lock, timeout):
+    try:
+        start = time.monotonic()
+        sock = socket.create_connection((host, port), timeout=timeout)
+        connected = time.monotonic()
+
+        send_json(sock, {"message_type": "HI", "username": username})
+        hi_sent = time.monotonic()
+        answer_sent = None
+        questions = 0
+
+        for line in sock.makefile('rb'):
+            message = json.loads(line)
+            msg_type = message.get("message_type")
+            now = time.monotonic()
+
+            if msg_type == "READY":
+                with stats_lock:
+                    stats["admission"].append(now - hi_sent)
+
+            elif msg_type == "QUESTION":
+                with stats_lock:
+                    first = stats["question_at"].setdefault(questions, now)
+                    stats["question_at"][questions] = min(first, now)
+                questions += 1
+                if mode == "silent":
+                    continue
+                if mode == "auto":
+                    answer = get_solver(message["question_type"])(message["short_question"])
+                else:
+                    answer = "wrong"
+                answer_sent = time.monotonic()
+                send_json(sock, {"message_type": "ANSWER", "answer": answer})
+
+            elif msg_type == "RESULT" and answer_sent is not None:
+                with stats_lock:
+                    stats["answer"].append(now - answer_sent)
+                answer_sent = None
+
+            elif msg_type == "FINISHED":
+                break
+
+        sock.close()
+        with stats_lock:
+            stats["connect"].append(connected - start)
+            stats["finished"] += 1
+    except (OSError, ValueError) as e:
+        with stats_lock:
+            stats["failed"] += 1
+            stats["errors"].append(f"{username}: {e}")
+
+
+def hold_idle(host, port, hold_seconds, idle_sockets):
+    # Connect and never send HI, like a stuck or hostile client
+    try:
+        sock = socket.create_connection((host, port), timeout=hold_seconds)
+        idle_sockets.append(sock)
+    except OSError:
+        pass
+
+
+def watch_spectators(host, port, count, stats, stats_lock, timeout, connected):
+    # One thread and one selector for every spectator connection
+    selector = selectors.DefaultSelector()
+    spectators = {}
+    for _ in range(count):
+        try:
+            sock = socket.create_connection((host, port), timeout=timeout)
+            send_json(sock, {"message_type": "SPECTATE"})
+        except OSError as e:
+            with stats_lock:
+                stats["spectators_failed"] += 1
+                stats["errors"].append(f"spectator: {e}")
+            continue
+        sock.setblocking(False)
+        spectators[sock] = {"buffer": b"", "questions": 0}
+        selector.register(sock, selectors.EVENT_READ)
+    connected.set()
+
+    deadline = time.monotonic() + timeout
+    while spectators and time.monotonic() < deadline:
+        for key, _ in selector.select(deadline - time.monotonic()):
+            sock = key.fileobj
+            spectator = spectators[sock]
+            try:
+                chunk = sock.recv(65536)
+            except BlockingIOError:
+                continue
+            except OSError:
+                chunk = b""
+            now = time.monotonic()
+
+            finished = False
+            spectator["buffer"] += chunk
+            while b"\n" in spectator["buffer"]:
+                line, _, spectator["buffer"] = spectator["buffer"].partition(b"\n")
+                msg_type = json.loads(line).get("message_type")
+                with stats_lock:
+                    stats["spectator_frames"] += 1
+                    if msg_type == "QUESTION":
+                        stats["spectator_question_at"].append((spectator["questions"], now))
+                        spectator["questions"] += 1
+                    elif msg_type == "FINISHED":
+                        stats["spectators_finished"] += 1
+                        finished = True
+
+            if finished or not chunk:
+                if not finished:
+                    with stats_lock:
+                        stats["spectators_failed"] += 1
+                selector.unregister(sock)
+                sock.close()
+                del spectators[sock]
+
+    for sock in spectators:
+        sock.close()
+    selector.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Trivia.NET load generator")
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, required=True)
+    parser.add_argument("--players", type=int, default=10, help="bot players that send HI")
+    parser.add_argument("--idle", type=int, default=0, help="connections opened first that never send HI")
+    parser.add_argument("--spectators", type=int, default=0, help="connections opened first that send SPECTATE")
+    parser.add_argument("--mode", choices=["auto", "wrong", "silent"], default="auto",
+                        help="how bots answer questions")
+    parser.add_argument("--prefix", default="Bot", help="username prefix for bots")
+    parser.add_argument("--timeout", type=float, default=60.0, help="per-socket timeout in seconds")
+    args = parser.parse_args()
+
+    stats = {"connect": [], "admission": [], "answer": [], "finished": 0, "failed": 0, "errors": [],
+             "question_at": {}, "spectator_frames": 0, "spectator_question_at": [],
+             "spectators_finished": 0, "spectators_failed": 0}
+    stats_lock = threading.Lock()
+
+    spectators_connected = threading.Event()
+    spectator_thread = threading.Thread(
+        target=watch_spectators,
+        args=(args.host, args.port, args.spectators, stats, stats_lock, args.timeout, spectators_connected)
+    )
+    spectator_thread.start()
+    spectators_connected.wait()
+
+    idle_sockets = []
+    idle_threads = [
+        threading.Thread(target=hold_idle, args=(args.host, args.port, args.timeout, idle_sockets))
+        for _ in range(args.idle)
+    ]
+    for t in idle_threads:
+        t.start()
+    for t in idle_threads:
+        t.join()
+
+    start = time.monotonic()
+    threads = [
+        threading.Thread(
+            target=run_bot,
+            args=(args.host, args.port, f"{args.prefix}{i}", args.mode, stats, stats_lock, args.timeout)
+        )
+        for i in range(args.players)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    spectator_thread.join()
+    elapsed = time.monotonic() - start
+
+    for sock in idle_sockets:
+        sock.close()
+
+    print(f"players:   {args.players} ({stats['finished']} finished, {stats['failed']} failed), "
+          f"idle: {args.idle}, wall time: {elapsed:.2f} s")
+    summarise("connect", stats["connect"])
+    summarise("admission", stats["admission"])
+    summarise("answer", stats["answer"])
+    if args.spectators:
+        print(f"spectators: {args.spectators} ({stats['spectators_finished']} finished, "
+              f"{stats['spectators_failed']} failed), {stats['spectator_frames']} frames")
+        summarise("lag", [at - stats["question_at"][question]
+                          for question, at in stats["spectator_question_at"]
+                          if question in stats["question_at"]])
+    for error in stats["errors"][:10]:
+        print(f"error: {error}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,301 @@
+"""
+Opt-in profiling for Trivia.NET servers
+
+Turned on with "profile": "<directory>" in the server config or the
+TRIVIA_PROFILE=<directory> environment variable; otherwise phase() is a
+no-op and nothing else runs. Meant to be used with loadgen.py:
+
+    TRIVIA_PROFILE=/tmp/profile python3 server.py --config server_config.json
+    python3 loadgen.py --port 7777 --players 200
+
+The server marks its phases (start_game, wait, send_to_all_players,
+receive_answers, end_round, and prepare_round on the round-prep thread)
+with phase(). Phases nest: time (both cProfile's and the wall time in
+the summary) is charged to the innermost phase only, while a phase's
+allocation peak includes the phases nested in it. The peak is process
+wide, so prepare_round running on its own thread shows up in the peak of
+whatever the game loop is doing at the time. While a game runs this
+collects:
+- cProfile data for each phase of each round on the game loop thread,
+  written as game01-round03-receive_answers.prof etc. plus one file per
+  phase for the whole game (open with pstats or snakeviz)
+- stack samples of every thread every sample_interval seconds, written
+  to game01-stacks.collapsed ("thread;round 3;phase;frame;frame count"
+  lines) for flamegraph.pl, speedscope or similar
+- with allocation tracking on (the default), the tracemalloc peak of
+  each phase and the lines whose memory grew the most from round 1 to
+  the end of the game
+
+end_game() writes the files for the game that just ended, prints a
+summary to stderr (also saved as game01-summary.txt) and starts afresh
+for the next one, so every game of a multi-game run gets its own files.
+stop_profiling() does the same for a game still in progress and stops.
+"""
+
+import contextlib
+import cProfile
+import io
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+
+PROFILE_ENV = "TRIVIA_PROFILE"
+DEFAULT_SAMPLE_INTERVAL = 0.001
+TRACEMALLOC_DEPTH = 10
+TOP_ALLOCATORS = 10
+
+_NO_PROFILING = contextlib.nullcontext()
+
+_directory = None
+_track_allocations = False
+_game = 0
+_round = 0
+_main_thread_id = None
+
+# thread id -> stack of phase labels, read by the sampler
+_phases = {}
+# thread id -> stack of {"child_seconds", "peak"} of the open phases
+_open_phases = {}
+# Stack of (profile, label) for the game loop thread; only the top one runs
+_profilers = []
+# (round, phase) -> pstats.Stats, phase -> {"calls", "seconds", "peak_bytes"}
+_round_stats = {}
+_phase_totals = {}
+_totals_lock = threading.Lock()
+
+_stacks = {}
+_sampler = None
+_sampler_stop = threading.Event()
+_first_snapshot = None
+
+
+def profile_directory(config):
+    """
+    Directory to write profiles to, or None if profiling is off.
+    """
+    return os.environ.get(PROFILE_ENV) or config.get("profile")
+
+
+def _frame_label(code):
+    return f"{code.co_name} ({os.path.basename(code.co_filename)})"
+
+
+def _sample(interval):
+    own_id = threading.get_ident()
+    while not _sampler_stop.wait(interval):
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own_id:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(_frame_label(frame.f_code))
+                frame = frame.f_back
+            stack.reverse()
+            key = ";".join([names.get(thread_id, str(thread_id))] + list(_phases.get(thread_id, ())) + stack)
+            _stacks[key] = _stacks.get(key, 0) + 1
+
+
+def start_profiling(directory, sample_interval=DEFAULT_SAMPLE_INTERVAL, track_allocations=True):
+    global _directory, _track_allocations, _main_thread_id, _sampler, _first_snapshot
+
+    os.makedirs(directory, exist_ok=True)
+    _directory = directory
+    _track_allocations = track_allocations
+    _main_thread_id = threading.get_ident()
+
+    if track_allocations:
+        tracemalloc.start(TRACEMALLOC_DEPTH)
+
+    _sampler_stop.clear()
+    _sampler = threading.Thread(target=_sample, args=(sample_interval,), name="profiler", daemon=True)
+    _sampler.start()
+    print(f"DEBUG: Profiling to {directory}", file=sys.stderr)
+
+
+def set_game(game_number):
+    """
+    Label what follows as game game_number (counting from 0), before its
+    first round.
+    """
+    global _game, _round
+
+    _game = game_number
+    _round = 0
+
+
+def set_round(round_number):
+    global _round, _first_snapshot
+
+    _round = round_number
+    if _track_allocations and _first_snapshot is None:
+        # Allocators are counted from the start of the round loop
+        _first_snapshot = tracemalloc.take_snapshot()
+
+
+def phase(name, round_number=None):
+    """
+    Context manager marking a phase of the game, e.g.
+        with phase("receive_answers"):
+    round_number defaults to the round given to set_round().
+    """
+    if _directory is None:
+        return _NO_PROFILING
+    return _profile_phase(name, _round if round_number is None else round_number)
+
+
+@contextlib.contextmanager
+def _profile_phase(name, round_number):
+    thread_id = threading.get_ident()
+    labels = _phases.setdefault(thread_id, [])
+    labels.append(f"round {round_number};{name}" if not labels else name)
+    open_phases = _open_phases.setdefault(thread_id, [])
+    if open_phases and _track_allocations:
+        # Entering this phase resets the peak, so keep the outer one's so far
+        open_phases[-1]["peak"] = max(open_phases[-1]["peak"], tracemalloc.get_traced_memory()[1])
+    current = {"child_seconds": 0.0, "peak": 0}
+    open_phases.append(current)
+
+    # cProfile only on the game loop thread; other threads are sampled
+    profile = None
+    if thread_id == _main_thread_id:
+        if _profilers:
+            _profilers[-1][0].disable()
+        profile = cProfile.Profile()
+        _profilers.append((profile, (round_number, name)))
+        profile.enable()
+
+    if _track_allocations:
+        start_bytes = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - start
+        peak = max(tracemalloc.get_traced_memory()[1], current["peak"]) if _track_allocations else 0
+        peak_bytes = peak - start_bytes if _track_allocations else 0
+        open_phases.pop()
+        if open_phases:
+            open_phases[-1]["child_seconds"] += seconds
+            open_phases[-1]["peak"] = max(open_phases[-1]["peak"], peak)
+        # Time spent in nested phases is theirs
+        seconds -= current["child_seconds"]
+
+        if profile is not None:
+            profile.disable()
+            _profilers.pop()
+            if _profilers:
+                _profilers[-1][0].enable()
+
+        labels.pop()
+        with _totals_lock:
+            if profile is not None:
+                key = (round_number, name)
+                if key in _round_stats:
+                    _round_stats[key].add(profile)
+                else:
+                    _round_stats[key] = pstats.Stats(profile)
+            totals = _phase_totals.setdefault(name, {"calls": 0, "seconds": 0.0, "peak_bytes": 0})
+            totals["calls"] += 1
+            totals["seconds"] += seconds
+            totals["peak_bytes"] = max(totals["peak_bytes"], peak_bytes)
+
+
+def _write_summary(out, allocators):
+    print(f"Game {_game + 1} phase totals (own wall time, largest allocation peak):", file=out)
+    for name, totals in sorted(_phase_totals.items(), key=lambda item: -item[1]["seconds"]):
+        print(f"  {name:<22} {totals['calls']:>5} calls {totals['seconds'] * 1000:10.2f} ms"
+              f"  peak {totals['peak_bytes'] / 1024:9.1f} KiB", file=out)
+
+    for name in sorted({name for _, name in _round_stats}):
+        stream = io.StringIO()
+        stats = pstats.Stats(stream=stream)
+        for (_, phase_name), round_stats in _round_stats.items():
+            if phase_name == name:
+                stats.add(round_stats)
+        stats.sort_stats("tottime").print_stats(5)
+        lines = [line for line in stream.getvalue().splitlines() if line.strip()]
+        print(f"\nTop functions in {name} (own time):", file=out)
+        # Keep the table header and rows, not pstats' preamble
+        header = next((i for i, line in enumerate(lines) if line.lstrip().startswith("ncalls")), 0)
+        for line in lines[header:]:
+            print(f"  {line}", file=out)
+
+    if allocators is not None:
+        print(f"\nTop {TOP_ALLOCATORS} allocators (memory growth since round 1):", file=out)
+        for stat in allocators:
+            frame = stat.traceback[0]
+            print(f"  {os.path.basename(frame.filename)}:{frame.lineno}: "
+                  f"{stat.size_diff / 1024:+.1f} KiB in {stat.count_diff:+d} blocks", file=out)
+
+
+def end_game():
+    """
+    Write the stack samples, the .prof files and the summary of the game
+    that just ended to the profile directory, then start counting again
+    for the next game.
+    """
+    global _stacks, _first_snapshot
+
+    if _directory is None or not _phase_totals:
+        return
+
+    prefix = os.path.join(_directory, f"game{_game + 1:02d}-")
+    stacks, _stacks = _stacks, {}
+    with open(f"{prefix}stacks.collapsed", "w") as f:
+        for stack, count in sorted(stacks.items()):
+            f.write(f"{stack} {count}\n")
+
+    by_phase = {}
+    with _totals_lock:
+        round_stats = sorted(_round_stats.items())
+    for (round_number, name), stats in round_stats:
+        stats.dump_stats(f"{prefix}round{round_number:02d}-{name}.prof")
+        by_phase.setdefault(name, pstats.Stats()).add(stats)
+    for name, stats in by_phase.items():
+        stats.dump_stats(f"{prefix}{name}.prof")
+
+    allocators = None
+    if _track_allocations and _first_snapshot is not None:
+        # Leave out what the profiling itself allocated
+        filters = [
+            tracemalloc.Filter(False, module.__file__)
+            for module in (tracemalloc, cProfile, pstats, sys.modules[__name__])
+        ]
+        snapshot = tracemalloc.take_snapshot().filter_traces(filters)
+        allocators = snapshot.compare_to(_first_snapshot.filter_traces(filters), "lineno")[:TOP_ALLOCATORS]
+
+    out = io.StringIO()
+    with _totals_lock:
+        _write_summary(out, allocators)
+        _round_stats.clear()
+        _phase_totals.clear()
+    with open(f"{prefix}summary.txt", "w") as f:
+        f.write(out.getvalue())
+    print(out.getvalue(), file=sys.stderr, end="")
+
+    _first_snapshot = None
+
+
+def stop_profiling():
+    """
+    Stop sampling and write out the game in progress, if any
+    (see end_game()).
+    """
+    global _directory, _sampler
+
+    if _directory is None:
+        return
+
+    _sampler_stop.set()
+    _sampler.join()
+    end_game()
+    if _track_allocations:
+        tracemalloc.stop()
+
+    _directory = None
+    _sampler = None
@@ -0,0 +1,91 @@
+"""
+Message decoding for Trivia.NET
+
+Every line a client sends goes through decode_message() before the
+server acts on it, in order of cost:
+1. size: lines longer than max_bytes are rejected without decoding
+2. type: message_type is picked out of the raw bytes with a pre-compiled
+   pattern and checked against the types allowed at that point of the
+   game, so garbage and unexpected messages never reach the JSON parser
+3. full parse, then a check of the fields of that message type
+
+Anything rejected raises MessageError. The server keeps a count per
+connection and only drops a client once it is over its error budget.
+"""
+
+import json
+import re
+
+MAX_MESSAGE_BYTES = 4096
+DEFAULT_ERROR_BUDGET = 5
+
+USERNAME_PATTERN = re.compile(r"[a-zA-Z0-9]+")
+
+# "message_type": "<TYPE>" anywhere in the line. Types written with JSON
+# escapes don't match; no client sends those.
+MESSAGE_TYPE_PATTERN = re.compile(rb'"message_type"\s*:\s*"([A-Z_]{1,32})"')
+
+
+class MessageError(ValueError):
+    pass
+
+
+def validate_username(username):
+    return isinstance(username, str) and USERNAME_PATTERN.fullmatch(username) is not None
+
+
+def check_hi(message):
+    if not validate_username(message.get("username")):
+        raise MessageError(f"invalid username {message.get('username')!r}")
+
+
+def check_answer(message):
+    if not isinstance(message.get("answer"), str):
+        raise MessageError("ANSWER without a text answer")
+
+
+# message_type -> field check run after the full parse
+FIELD_CHECKS = {
+    "HI": check_hi,
+    "ANSWER": check_answer,
+    "BYE": None,
+    "SPECTATE": None,
+}
+
+
+def peek_message_type(line: bytes) -> str | None:
+    """
+    Return the message_type of a raw line without parsing it, or None if
+    it doesn't look like it has one.
+    """
+    match = MESSAGE_TYPE_PATTERN.search(line)
+    return match.group(1).decode("ascii") if match else None
+
+
+def decode_message(line: bytes, allowed_types, max_bytes=MAX_MESSAGE_BYTES) -> dict:
+    """
+    Decode and validate one line (without its newline). Returns the
+    message dict; raises MessageError if the line is too long, isn't one
+    of allowed_types or isn't a valid message of its type.
+    """
+    if len(line) > max_bytes:
+        raise MessageError(f"message of {len(line)} bytes is over the {max_bytes} byte limit")
+
+    message_type = peek_message_type(line)
+    if message_type not in allowed_types:
+        raise MessageError(f"unexpected message type {message_type!r}")
+
+    try:
+        # Decoding first is faster than letting json.loads() detect the encoding
+        message = json.loads(line.decode("utf-8"))
+    except (ValueError, RecursionError):
+        raise MessageError("malformed JSON") from None
+
+    # The pattern could have matched inside a string value
+    if not isinstance(message, dict) or message.get("message_type") != message_type:
+        raise MessageError("malformed message")
+
+    check = FIELD_CHECKS.get(message_type)
+    if check is not None:
+        check(message)
+    return message
@@ -6,10 +6,25 @@ This module contains:
 2. Solving functions: Get the correct answer for a question
 
 Both server and client import from this module.
+
+Every generator takes an optional rng (a random.Random). Without one
+they draw from the shared global generator. Pass a per-game or
+per-question-type stream from derive_rng() for reproducible
+questions that don't contend on global state.
 """
 
 import random
 
+
+def derive_rng(seed, *stream) -> random.Random:
+    """
+    Make an independent generator for a named stream of a seed, e.g.
+    derive_rng(seed, "Mathematics") or derive_rng(seed, game_number).
+    The same seed and stream always give the same sequence.
+    """
+    return random.Random(":".join(str(part) for part in (seed, *stream)))
+
+
 def ip_to_int(ip_str):
     octets = ip_str.split('.')
     return (int(octets[0]) << 24) + (int(octets[1]) << 16) + \
@@ -44,14 +59,14 @@ def parse_cidr(cidr):
 
 
 
-def generate_mathematics_question():
+def generate_mathematics_question(rng=random):
     """
     Generate a random mathematics expression with 2-5 operands and +/- operators.
     Returns the expression as a string (e.g., "5 + 3 - 2").
     """
-    num_operands = random.randint(2, 5)
-    operands = [random.randint(1, 100) for _ in range(num_operands)]
-    operators = [random.choice(['+', '-']) for _ in range(num_operands - 1)]
+    num_operands = rng.randint(2, 5)
+    operands = [rng.randint(1, 100) for _ in range(num_operands)]
+    operators = [rng.choice(['+', '-']) for _ in range(num_operands - 1)]
 
     # Build expression string
     expression = str(operands[0])
@@ -82,9 +97,9 @@ def solve_mathematics_question(expression):
     return str(result)
 
 
-def generate_roman_numerals_question():
+def generate_roman_numerals_question(rng=random):
 
-    number = random.randint(1, 3999)
+    number = rng.randint(1, 3999)
 
     # Convert to Roman numeral
     values = [
@@ -126,11 +141,11 @@ def solve_roman_numerals_question(roman):
 
     return str(total)
 
-def generate_usable_addresses_question():
+def generate_usable_addresses_question(rng=random):
 
-    octets = [random.randint(0, 255) for _ in range(4)]
+    octets = [rng.randint(0, 255) for _ in range(4)]
     ip = '.'.join(map(str, octets))
-    prefix_length = random.randint(0, 32)  # /0 to /32
+    prefix_length = rng.randint(0, 32)  # /0 to /32
 
     return f"{ip}/{prefix_length}"
 
@@ -147,11 +162,11 @@ def solve_usable_addresses_question(cidr):
 
 
 
-def generate_network_broadcast_question():
+def generate_network_broadcast_question(rng=random):
 
-    octets = [random.randint(0, 255) for _ in range(4)]
+    octets = [rng.randint(0, 255) for _ in range(4)]
     ip = '.'.join(map(str, octets))
-    prefix_length = random.randint(0, 32)
+    prefix_length = rng.randint(0, 32)
 
     return f"{ip}/{prefix_length}"
 
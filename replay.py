@@ -0,0 +1,217 @@
+"""
+Replay a recorded game against server.py
+
+Reads one game from an event log written by the server (see game_log.py)
+and re-drives it: every recorded player connects, sends HI, answers each
+question with the answer it gave originally and leaves when it left.
+
+At --speed 1 connects and answers keep their recorded timing relative to
+each QUESTION. At --speed max they are sent as soon as possible, which is
+useful for profiling the server under the same load.
+
+Usage:
+    python3 replay.py games.jsonl --port 7777 [--game ID] [--speed max]
+    python3 replay.py games.jsonl --config server_config.json [--speed max]
+
+With --config, a server.py is started on a free port with that config,
+adjusted to the recorded number of players, question types and seed, so
+the same questions are asked again.
+"""
+
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from game_log import read_events
+
+
+def build_scripts(events):
+    """
+    Turn the event list into one script per player:
+    {"username", "connect_at", "answers": {question: (delay, answer)},
+     "leave_after", "leave_before"}
+    A player who left after answering a question leaves once its RESULT
+    arrives (leave_after); one who left or was dropped without answering
+    leaves as soon as that QUESTION arrives (leave_before). leave_after 0
+    is leaving before the first question.
+    """
+    scripts = {}
+    question_times = {}
+    current_question = 0
+
+    for event in events:
+        kind = event["event"]
+        if kind == "connect":
+            scripts[event["username"]] = {
+                "username": event["username"],
+                "connect_at": event["t"],
+                "answers": {},
+                "leave_after": None,
+                "leave_before": None
+            }
+        elif kind == "question":
+            current_question = event["number"]
+            question_times[current_question] = event["t"]
+        elif kind == "answer" and event["username"] in scripts:
+            delay = max(0.0, event["t"] - question_times.get(current_question, event["t"]))
+            scripts[event["username"]]["answers"][current_question] = (delay, event["answer"])
+        elif kind == "disconnect" and event["username"] in scripts:
+            script = scripts[event["username"]]
+            if script["leave_after"] is None and script["leave_before"] is None:
+                if current_question == 0 or current_question in script["answers"]:
+                    script["leave_after"] = current_question
+                else:
+                    script["leave_before"] = current_question
+
+    return list(scripts.values())
+
+
+def send_json(sock, message):
+    sock.sendall((json.dumps(message) + "\n").encode('utf-8'))
+
+
+def replay_player(host, port, script, realtime, start, results):
+    username = script["username"]
+    try:
+        if realtime:
+            time.sleep(max(0.0, start + script["connect_at"] - time.monotonic()))
+
+        sock = socket.create_connection((host, port))
+        send_json(sock, {"message_type": "HI", "username": username})
+
+        if script["leave_after"] == 0:
+            send_json(sock, {"message_type": "BYE"})
+            sock.close()
+            results[username] = "left"
+            return
+
+        question = 0
+        for line in sock.makefile('rb'):
+            message = json.loads(line)
+            msg_type = message.get("message_type")
+
+            if msg_type == "QUESTION":
+                question += 1
+                if script["leave_before"] == question:
+                    send_json(sock, {"message_type": "BYE"})
+                    results[username] = "left"
+                    break
+                if question in script["answers"]:
+                    delay, answer = script["answers"][question]
+                    if realtime:
+                        time.sleep(delay)
+                    send_json(sock, {"message_type": "ANSWER", "answer": answer})
+
+            elif msg_type == "RESULT" and script["leave_after"] == question:
+                send_json(sock, {"message_type": "BYE"})
+                results[username] = "left"
+                break
+
+            elif msg_type == "FINISHED":
+                results[username] = "finished"
+                break
+
+        sock.close()
+    except (OSError, ValueError) as e:
+        results[username] = f"error: {e}"
+
+
+def free_port():
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(config_path, events, num_players):
+    with open(config_path) as f:
+        server_config = json.load(f)
+
+    game_start = next(event for event in events if event["event"] == "game_start")
+    server_config["port"] = free_port()
+    server_config["players"] = num_players
+    server_config["question_types"] = game_start["question_types"]
+    server_config["seed"] = game_start["seed"]
+    # A replay must not add to the real logs or all-time scores, and plays
+    # exactly the one game
+    server_config.pop("event_log", None)
+    server_config.pop("score_store", None)
+    server_config["games"] = 1
+
+    fd, path = tempfile.mkstemp(suffix=".json")
+    with os.fdopen(fd, "w") as f:
+        json.dump(server_config, f)
+
+    server_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "server.py")
+    process = subprocess.Popen([sys.executable, server_path, "--config", path])
+
+    # Wait for the server to start listening. The probe connection never
+    # sends HI, so the server evicts it without using up a player slot
+    deadline = time.monotonic() + 10
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", server_config["port"]), timeout=0.1).close()
+            break
+        except OSError:
+            time.sleep(0.05)
+
+    return process, server_config["port"], path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a recorded Trivia.NET game")
+    parser.add_argument("log", help="event log written by server.py")
+    parser.add_argument("--game", help="game id to replay (default: last game in the log)")
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, help="port of a running server")
+    parser.add_argument("--config", help="start server.py with this config instead of using --port")
+    parser.add_argument("--speed", choices=["1", "max"], default="1")
+    args = parser.parse_args()
+
+    if (args.port is None) == (args.config is None):
+        parser.error("exactly one of --port or --config is required")
+
+    events = read_events(args.log, args.game)
+    scripts = build_scripts(events)
+
+    process = None
+    host, port = args.host, args.port
+    if args.config:
+        process, port, temp_config = start_server(args.config, events, len(scripts))
+        host = "127.0.0.1"
+
+    results = {}
+    start = time.monotonic()
+    threads = [
+        threading.Thread(target=replay_player,
+                         args=(host, port, script, args.speed == "1", start, results))
+        for script in scripts
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.monotonic() - start
+
+    if process:
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+        os.remove(temp_config)
+
+    finished = sum(1 for result in results.values() if result == "finished")
+    print(f"Replayed game {events[0]['game']}: {len(scripts)} players, "
+          f"{finished} finished, {elapsed:.2f} s at speed {args.speed}")
+    for username, result in sorted(results.items()):
+        if result.startswith("error"):
+            print(f"{username}: {result}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,629 @@
+"""
+Integration tests for server.py and client.py
+
+Each case starts its own server.py on a port picked by the OS, plays the
+lines of tests/test_NN_input.txt over a socket and compares everything
+the server sent back with tests/test_NN_output.txt. The test configs set
+a seed, so the questions (and so the output) are the same every run.
+
+Client lines are sent when the server is ready for them rather than
+after fixed sleeps: ANSWER waits for a QUESTION, BYE waits for READY and
+anything else is sent straight away. All cases run in parallel.
+
+Cases from 14 on have no golden file: they play several clients against
+one server from a function and check what each of them got.
+
+Usage:
+    python3 run_tests.py [--update] [--timing] [CASE ...]
+
+--update rewrites the golden output files from this run.
+--timing also holds test 13 to the client cold-start time budget; it then
+runs on its own after the other cases, as timings taken while the
+servers run are not worth much.
+"""
+
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from client import apply_leaderboard_delta
+from questions import get_solver
+from transport import COMPRESSION, inflate_frame, make_inflater
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+TESTS = os.path.join(ROOT, "tests")
+
+# Message a client line waits for before it is sent
+SEND_AFTER = {
+    "ANSWER": "QUESTION",
+    "BYE": "READY",
+}
+
+CASE_TIMEOUT = 20.0
+
+
+def has_types(*message_types):
+    def check(messages, raw):
+        found = [message.get("message_type") for message in messages]
+        missing = [t for t in message_types if t not in found]
+        return f"missing {', '.join(missing)}" if missing else None
+    return check
+
+
+def has_fields(message_type, *fields):
+    def check(messages, raw):
+        for message in messages:
+            if message.get("message_type") == message_type:
+                missing = [field for field in fields if field not in message]
+                return f"{message_type} missing {', '.join(missing)}" if missing else None
+        return f"no {message_type} message"
+    return check
+
+
+def no_ready(messages, raw):
+    if any(message.get("message_type") == "READY" for message in messages):
+        return "server sent READY"
+    return None
+
+
+def newline_terminated(messages, raw):
+    if not raw or not raw.endswith(b"\n"):
+        return "messages are not newline terminated"
+    return None
+
+
+def game_starts(messages, raw):
+    if not any("Game starts" in message.get("info", "") for message in messages):
+        return "READY info does not say when the game starts"
+    return None
+
+
+# number: (description, server config, stop after message type, listen window, checks)
+# With a listen window the client stops quietly after that many seconds
+# instead of waiting for the server to finish the game.
+CASES = {
+    1: ("Server sends READY message", "server_test.json", "READY", None,
+        [has_types("READY"), game_starts]),
+    2: ("Server sends QUESTION message", "server_test.json", "QUESTION", None,
+        [has_types("QUESTION")]),
+    3: ("Server accepts ANSWER and sends RESULT", "server_test.json", "RESULT", None,
+        [has_types("RESULT")]),
+    4: ("Server sends FINISHED message at game end", "server_test.json", None, None,
+        [has_types("FINISHED"), has_fields("FINISHED", "final_standings")]),
+    5: ("READY message contains correct information", "server_test.json", "READY", None,
+        [has_fields("READY", "info")]),
+    6: ("QUESTION message contains all required fields", "server_test.json", "QUESTION", None,
+        [has_fields("QUESTION", "question_type", "trivia_question", "short_question", "time_limit")]),
+    7: ("RESULT message contains correct and feedback fields", "server_test.json", "RESULT", None,
+        [has_fields("RESULT", "correct", "feedback")]),
+    8: ("Server rejects non-alphanumeric username", "server_test.json", None, None,
+        [no_ready]),
+    9: ("Server handles BYE message from client", "server_test.json", None, None,
+        [has_types("READY")]),
+    10: ("Server messages end with newline", "server_test.json", "READY", None,
+         [newline_terminated]),
+    11: ("Server waits for required number of players", "server_2player.json", None, 1.0,
+         [no_ready]),
+    12: ("Complete game flow", "server_test.json", None, None,
+         [has_types("READY", "QUESTION", "RESULT", "FINISHED")]),
+}
+
+
+def start_server(config_name, overrides=None):
+    """
+    Start server.py on a free port; returns (process, port, config path,
+    log), log being the list of stderr lines so far (filled in as the
+    server runs). Waits for the server to report its port rather than
+    sleeping. overrides replace settings of the config file.
+    """
+    with open(os.path.join(TESTS, config_name)) as f:
+        server_config = json.load(f)
+    server_config.update(overrides or {})
+    server_config["port"] = 0
+
+    fd, path = tempfile.mkstemp(suffix=".json")
+    with os.fdopen(fd, "w") as f:
+        json.dump(server_config, f)
+
+    process = subprocess.Popen(
+        [sys.executable, os.path.join(ROOT, "server.py"), "--config", path],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        text=True
+    )
+    log = []
+    for line in process.stderr:
+        if line.startswith("DEBUG: Listening on port "):
+            # Keep draining stderr so the server never blocks on it; lines
+            # show up in log as they are read
+            threading.Thread(target=log.extend, args=(process.stderr,), daemon=True).start()
+            return process, int(line.rsplit(" ", 1)[1]), path, log
+
+    raise RuntimeError(f"server.py exited before listening (status {process.wait()})")
+
+
+def play_script(port, lines, stop_after, window):
+    """
+    Send the script lines as the server becomes ready for them and collect
+    the decoded messages and raw bytes received: complete lines only, up to
+    and including the stop_after message.
+    """
+    deadline = time.monotonic() + (window if window is not None else CASE_TIMEOUT)
+    sock = socket.create_connection(("127.0.0.1", port))
+    pending = list(lines)
+    raw = b""
+    messages = []
+
+    def send_ready_lines(received_type):
+        while pending:
+            waits_for = SEND_AFTER.get(json.loads(pending[0]).get("message_type"))
+            if waits_for is not None and waits_for != received_type:
+                return
+            sock.sendall(pending.pop(0).encode("utf-8") + b"\n")
+            received_type = None
+
+    try:
+        send_ready_lines(None)
+        buffer = b""
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            sock.settimeout(remaining)
+            try:
+                chunk = sock.recv(4096)
+            except socket.timeout:
+                break
+            except ConnectionResetError:
+                break
+            if not chunk:
+                break
+
+            buffer += chunk
+            stop = False
+            while b"\n" in buffer:
+                line, _, buffer = buffer.partition(b"\n")
+                raw += line + b"\n"
+                message = json.loads(line)
+                messages.append(message)
+                send_ready_lines(message.get("message_type"))
+                if message.get("message_type") == stop_after:
+                    stop = True
+                    break
+            if stop:
+                break
+    finally:
+        sock.close()
+
+    return messages, raw
+
+
+def run_case(number, update):
+    description, config_name, stop_after, window, checks = CASES[number]
+    input_path = os.path.join(TESTS, f"test_{number:02d}_input.txt")
+    output_path = os.path.join(TESTS, f"test_{number:02d}_output.txt")
+
+    with open(input_path) as f:
+        lines = [line.strip() for line in f if line.strip()]
+
+    process, port, config_path, _ = start_server(config_name)
+    try:
+        messages, raw = play_script(port, lines, stop_after, window)
+    finally:
+        process.kill()
+        process.wait()
+        os.remove(config_path)
+
+    for check in checks:
+        reason = check(messages, raw)
+        if reason:
+            return number, description, reason
+
+    if update:
+        with open(output_path, "wb") as f:
+            f.write(raw)
+    else:
+        with open(output_path, "rb") as f:
+            expected = f.read()
+        if raw != expected:
+            return number, description, f"output differs from {os.path.relpath(output_path, ROOT)}"
+
+    return number, description, None
+
+
+def connect(port, message):
+    """
+    Connect a client and send its first message; returns (socket, reader).
+    """
+    sock = socket.create_connection(("127.0.0.1", port), timeout=CASE_TIMEOUT)
+    send(sock, message)
+    return sock, sock.makefile("rb")
+
+
+def send(sock, message):
+    sock.sendall(json.dumps(message).encode("utf-8") + b"\n")
+
+
+def read_until(reader, message_type, inflater=None):
+    """
+    Read messages up to and including the next message_type. Returns them
+    all; if the server closed first, the last one (if any) is something
+    else.
+    With an inflater, DEFLATE frames are unwrapped (and marked with
+    "deflated": True).
+    """
+    messages = []
+    for line in reader:
+        message = json.loads(line)
+        if inflater is not None and message.get("message_type") == "DEFLATE":
+            message = json.loads(inflate_frame(inflater, message))
+            message["deflated"] = True
+        messages.append(message)
+        if message.get("message_type") == message_type:
+            break
+    return messages
+
+
+def answer_for(question):
+    return get_solver(question["question_type"])(question["short_question"])
+
+
+def check_leaderboard_deltas(port):
+    """
+    A player taking LEADERBOARD_DELTA rebuilds exactly the text another
+    player gets in LEADERBOARD, across snapshots, changes and a player
+    leaving. Usernames are unique, as deltas are keyed by them.
+    """
+    delta_sock, delta_reader = connect(port, {"message_type": "HI", "username": "Delta",
+                                              "leaderboard_deltas": True})
+    full_sock, full_reader = connect(port, {"message_type": "HI", "username": "Full"})
+    # A second "Delta" would merge into the first one's entry in the deltas
+    _, duplicate_reader = connect(port, {"message_type": "HI", "username": "Delta"})
+    if read_until(duplicate_reader, "READY"):
+        return "a duplicate username was admitted"
+    leaver_sock, leaver_reader = connect(port, {"message_type": "HI", "username": "Leaver",
+                                                "leaderboard_deltas": True})
+    standings = {"scores": {}, "points_nouns": ["point", "points"]}
+    kinds = set()
+
+    for round_number in range(4):
+        clients = [(delta_sock, delta_reader), (full_sock, full_reader)]
+        if round_number == 0:
+            clients.append((leaver_sock, leaver_reader))
+        for i, (sock, reader) in enumerate(clients):
+            question = read_until(reader, "QUESTION")[-1]
+            # Delta always right, Full every other round, Leaver never
+            right = i == 0 or (i == 1 and round_number % 2)
+            send(sock, {"message_type": "ANSWER", "answer": answer_for(question) if right else "x"})
+
+        delta = read_until(delta_reader, "LEADERBOARD_DELTA")[-1]
+        full = read_until(full_reader, "LEADERBOARD")[-1]
+        if delta.get("message_type") != "LEADERBOARD_DELTA" or full.get("message_type") != "LEADERBOARD":
+            return f"round {round_number + 1}: no leaderboard"
+        kinds.add(delta["snapshot"])
+        rebuilt = apply_leaderboard_delta(standings, delta)
+        if rebuilt != full["state"]:
+            return f"round {round_number + 1}: rebuilt {rebuilt!r}, LEADERBOARD has {full['state']!r}"
+
+        if round_number == 0:
+            read_until(leaver_reader, "LEADERBOARD_DELTA")
+            send(leaver_sock, {"message_type": "BYE"})
+            leaver_sock.close()
+
+    if kinds != {True, False}:
+        return "expected both snapshots and deltas"
+    return None
+
+
+def check_deflate(port):
+    """
+    A player that asked for compression gets DEFLATE frames that inflate
+    to the same messages a plain player gets.
+    """
+    deflate_sock, deflate_reader = connect(port, {"message_type": "HI", "username": "Packed",
+                                                  "compression": COMPRESSION})
+    plain_sock, plain_reader = connect(port, {"message_type": "HI", "username": "Plain"})
+    clients = [(deflate_sock, deflate_reader, make_inflater(), []), (plain_sock, plain_reader, None, [])]
+
+    playing = True
+    while playing:
+        for sock, reader, inflater, received in clients:
+            messages = read_until(reader, "QUESTION", inflater)
+            received += messages
+            playing = messages[-1].get("message_type") == "QUESTION"
+            if playing:
+                # Both answer the same, so even the RESULTs match
+                send(sock, {"message_type": "ANSWER", "answer": "x"})
+
+    packed, plain = clients[0][3], clients[1][3]
+    if not [message.pop("deflated") for message in packed if "deflated" in message]:
+        return "no DEFLATE frames"
+    if packed != plain or packed[-1].get("message_type") != "FINISHED":
+        return "inflated messages differ from the plain player's"
+    return None
+
+
+def check_bad_messages(port):
+    """
+    Oversized and garbage lines within the error budget are ignored and
+    the player keeps playing; a player over the budget is disconnected
+    and left out of the standings. Expects an error budget of 2.
+    """
+    good_sock, good_reader = connect(port, {"message_type": "HI", "username": "Good"})
+    flood_sock, flood_reader = connect(port, {"message_type": "HI", "username": "Flood"})
+
+    question = read_until(good_reader, "QUESTION")[-1]
+    good_sock.sendall(b"9" * 1000 + b"\nnot json\n")
+    send(good_sock, {"message_type": "ANSWER", "answer": answer_for(question)})
+    result = read_until(good_reader, "RESULT")[-1]
+    if result.get("correct") is not True:
+        return f"answer after bad lines was not accepted: {result}"
+
+    read_until(flood_reader, "QUESTION")
+    flood_sock.sendall(b"garbage\n" * 3)
+    if any(message.get("message_type") == "FINISHED" for message in read_until(flood_reader, "FINISHED")):
+        return "player over the error budget was not disconnected"
+
+    # Good plays the rest of the game on its own
+    while (last := read_until(good_reader, "QUESTION")[-1]).get("message_type") == "QUESTION":
+        send(good_sock, {"message_type": "ANSWER", "answer": answer_for(last)})
+    finished = last
+    if finished.get("message_type") != "FINISHED":
+        return "no FINISHED for the well-behaved player"
+    if "Flood" in finished["final_standings"] or "Good" not in finished["final_standings"]:
+        return f"wrong final standings: {finished['final_standings']!r}"
+    return None
+
+
+def check_spectators(port):
+    """
+    A spectator admitted before the game and one joining during it get
+    the broadcasts (QUESTION, LEADERBOARD, FINISHED) and nothing else,
+    and don't take a player slot.
+    """
+    early_sock, early_reader = connect(port, {"message_type": "SPECTATE"})
+    player_sock, player_reader = connect(port, {"message_type": "HI", "username": "Player"})
+
+    late_sock = None
+    while (last := read_until(player_reader, "QUESTION")[-1]).get("message_type") == "QUESTION":
+        if late_sock is None:
+            late_sock, late_reader = connect(port, {"message_type": "SPECTATE"})
+        send(player_sock, {"message_type": "ANSWER", "answer": answer_for(last)})
+    if last.get("message_type") != "FINISHED":
+        return "no FINISHED for the player"
+
+    expected = {"QUESTION": 3, "LEADERBOARD": 2, "FINISHED": 1}
+    for name, reader, exact in (("early", early_reader, True), ("late", late_reader, False)):
+        messages = read_until(reader, "FINISHED")
+        counts = {}
+        for message in messages:
+            counts[message["message_type"]] = counts.get(message["message_type"], 0) + 1
+        if set(counts) - set(expected) or (exact and counts != expected):
+            return f"{name} spectator got {counts}"
+        if messages[-1] != last:
+            return f"{name} spectator's FINISHED differs from the player's"
+    return None
+
+
+def check_early_close(port):
+    """
+    With early close, a question closes shortly after enough players have
+    answered; the answer of a player cut off by it arrives between
+    questions and must not be taken as their answer to the next question.
+    Expects question_seconds well above the grace period.
+    """
+    fast_sock, fast_reader = connect(port, {"message_type": "HI", "username": "Fast"})
+    slow_sock, slow_reader = connect(port, {"message_type": "HI", "username": "Slow"})
+
+    question = read_until(fast_reader, "QUESTION")[-1]
+    asked_at = time.monotonic()
+    send(fast_sock, {"message_type": "ANSWER", "answer": answer_for(question)})
+    read_until(fast_reader, "LEADERBOARD")
+    slow_messages = read_until(slow_reader, "LEADERBOARD")
+    if time.monotonic() - asked_at >= question["time_limit"] / 2:
+        return "question 1 did not close early"
+    if any(message["message_type"] == "RESULT" for message in slow_messages):
+        return "RESULT for a player who didn't answer"
+    # Too late for question 1, and before question 2 is asked
+    send(slow_sock, {"message_type": "ANSWER", "answer": answer_for(question)})
+
+    question = read_until(slow_reader, "QUESTION")[-1]
+    send(slow_sock, {"message_type": "ANSWER", "answer": answer_for(question)})
+    result = read_until(slow_reader, "RESULT")[-1]
+    if result.get("correct") is not True:
+        return f"late answer to question 1 was taken for question 2: {result}"
+    return None
+
+
+def check_split_oversized_line(port):
+    """
+    A valid line queued ahead of an oversized one that takes several
+    recv() calls to read is still handled, and what is left of the
+    oversized line is dropped instead of becoming a message of its own.
+    Expects max_message_bytes well under 4096, a question_seconds
+    short enough to miss and a long enough interval.
+    """
+    sock, reader = connect(port, {"message_type": "HI", "username": "Splitter"})
+
+    # Miss question 1, so the next lines are read in one go before question 2
+    read_until(reader, "QUESTION")
+    read_until(reader, "LEADERBOARD")
+    sock.sendall(json.dumps({"message_type": "BYE"}).encode("utf-8") + b"\n" + b"y" * 10000 + b"\n")
+
+    messages = read_until(reader, "FINISHED")
+    if any(message["message_type"] in ("QUESTION", "FINISHED") for message in messages):
+        return "BYE queued before an oversized line was lost"
+    return None
+
+
+# number: (description, server config, config overrides, check(port) -> reason or None)
+CHECK_CASES = {
+    14: ("LEADERBOARD_DELTA rebuilds the LEADERBOARD text", "server_2player.json",
+         {"players": 3, "question_types": ["Mathematics"] * 5, "question_interval_seconds": 0.2,
+          "leaderboard_snapshot_rounds": 2},
+         check_leaderboard_deltas),
+    15: ("DEFLATE frames inflate to the plain messages", "server_2player.json",
+         {"compression_threshold_bytes": 0, "question_interval_seconds": 0.2},
+         check_deflate),
+    16: ("Bad messages count against an error budget", "server_2player.json",
+         {"error_budget": 2, "max_message_bytes": 256, "question_interval_seconds": 0.2},
+         check_bad_messages),
+    17: ("Spectators get the broadcasts only", "server_test.json",
+         {"question_types": ["Mathematics"] * 3, "question_interval_seconds": 0.2},
+         check_spectators),
+    18: ("Early close leaves late answers out of the next question", "server_2player.json",
+         {"question_types": ["Mathematics"] * 2, "question_seconds": 5, "question_interval_seconds": 0.5,
+          "early_close_fraction": 0.5, "early_close_grace_seconds": 0.1},
+         check_early_close),
+    19: ("A line queued before an oversized one is kept", "server_test.json",
+         {"question_types": ["Mathematics"] * 2, "question_seconds": 0.3, "question_interval_seconds": 0.5,
+          "max_message_bytes": 100},
+         check_split_oversized_line),
+}
+
+
+def run_check_case(number):
+    description, config_name, overrides, check = CHECK_CASES[number]
+    process, port, config_path, _ = start_server(config_name, overrides)
+    try:
+        reason = check(port)
+    except Exception as e:
+        # Including a check tripping over a reply it didn't expect
+        reason = f"{type(e).__name__}: {e}"
+    finally:
+        process.kill()
+        process.wait()
+        os.remove(config_path)
+    return number, description, reason
+
+
+def wait_for_log(log, text):
+    deadline = time.monotonic() + CASE_TIMEOUT / 4
+    while not any(text in line for line in log):
+        if time.monotonic() > deadline:
+            raise TimeoutError(f"server never logged {text!r}")
+        time.sleep(0.05)
+
+
+def run_reload_check():
+    """
+    Test 20: config hot reload over two games. During game 1 the config
+    file is made invalid (rejected, the old config stays), then changed
+    to a new question_word (used from game 2 on) and port (refused until
+    a restart). A player who connects before game 1 starts but only sends
+    HI once it has started plays game 2.
+    """
+    description = "Config reloads apply from the next game"
+    overrides = {"games": 2, "question_types": ["Mathematics"] * 2, "question_interval_seconds": 0.2,
+                 "config_poll_seconds": 0.05}
+    process, port, config_path, log = start_server("server_test.json", overrides)
+
+    def edit_config(text):
+        with open(config_path, "w") as f:
+            f.write(text)
+
+    try:
+        with open(config_path) as f:
+            server_config = json.load(f)
+        next_sock = socket.create_connection(("127.0.0.1", port), timeout=CASE_TIMEOUT)
+        next_reader = next_sock.makefile("rb")
+        first_sock, first_reader = connect(port, {"message_type": "HI", "username": "First"})
+        question = read_until(first_reader, "QUESTION")[-1]
+        send(next_sock, {"message_type": "HI", "username": "Next"})
+
+        edit_config("{ not json")
+        wait_for_log(log, "Config reload failed, keeping the current config")
+        edit_config(json.dumps({**server_config, "question_word": "Frage", "port": 1}))
+        wait_for_log(log, "port only change on restart")
+        wait_for_log(log, "Config reloaded")
+
+        while question.get("message_type") == "QUESTION":
+            if not question["trivia_question"].startswith("Question "):
+                return 20, description, f"game 1 changed its config: {question['trivia_question']!r}"
+            send(first_sock, {"message_type": "ANSWER", "answer": answer_for(question)})
+            question = read_until(first_reader, "QUESTION")[-1]
+
+        questions = 0
+        while (question := read_until(next_reader, "QUESTION")[-1]).get("message_type") == "QUESTION":
+            questions += 1
+            if not question["trivia_question"].startswith("Frage "):
+                return 20, description, f"game 2 kept the old config: {question['trivia_question']!r}"
+            send(next_sock, {"message_type": "ANSWER", "answer": answer_for(question)})
+        if questions != 2 or question.get("message_type") != "FINISHED":
+            return 20, description, "the player who joined during game 1 didn't play game 2"
+        if process.wait(CASE_TIMEOUT) != 0:
+            return 20, description, "server.py didn't exit cleanly after game 2"
+    except Exception as e:
+        return 20, description, f"{type(e).__name__}: {e}"
+    finally:
+        process.kill()
+        process.wait()
+        os.remove(config_path)
+    return 20, description, None
+
+
+def run_startup_check(timing):
+    """
+    Test 13: client.py cold start (see bench_startup.py). The time budget
+    is only checked with timing set.
+    """
+    description = "Client starts without loading mode specific modules"
+    budget = [] if timing else ["--budget-ms", "0"]
+    result = subprocess.run(
+        [sys.executable, os.path.join(ROOT, "bench_startup.py"), "--runs", "3"] + budget,
+        capture_output=True,
+        text=True
+    )
+    if result.returncode != 0:
+        failures = [line for line in result.stderr.splitlines() if line.startswith("FAIL")]
+        return 13, description, failures[0] if failures else "bench_startup.py failed"
+    return 13, description, None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Trivia.NET integration tests")
+    parser.add_argument("cases", nargs="*", type=int, help="case numbers to run (default: all)")
+    parser.add_argument("--update", action="store_true", help="rewrite golden output files")
+    parser.add_argument("--timing", action="store_true", help="check the cold-start budget in test 13")
+    args = parser.parse_args()
+
+    selected = args.cases or list(CASES) + [13] + list(CHECK_CASES) + [20]
+    start = time.monotonic()
+
+    results = []
+    games = [number for number in selected if number != 13]
+    if games:
+        with ThreadPoolExecutor(max_workers=len(games)) as pool:
+            futures = [
+                pool.submit(run_check_case, number) if number in CHECK_CASES
+                else pool.submit(run_reload_check) if number == 20
+                else pool.submit(run_case, number, args.update)
+                for number in games
+            ]
+            results = [future.result() for future in futures]
+    if 13 in selected:
+        results.append(run_startup_check(args.timing))
+
+    failed = 0
+    for number, description, reason in sorted(results):
+        if reason:
+            failed += 1
+            print(f"FAIL: {number}. {description}")
+            print(f"  Reason: {reason}")
+        else:
+            print(f"PASS: {number}. {description}")
+
+    print(f"\nTotal Tests: {len(results)}  Passed: {len(results) - failed}  Failed: {failed}  "
+          f"({time.monotonic() - start:.1f} s)")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,233 @@
+"""
+Persistent cross-game score store for Trivia.NET
+
+Keeps cumulative per-player stats (games, wins, points, answers) across
+games. The server only calls record_answer() and record_game(), which put
+rows on a queue. A batching writer thread applies them to the store in
+one transaction per batch, so round latency doesn't depend on the disk.
+
+Stores are pluggable through STORE_BACKENDS. A backend needs:
+- write_batch(items): apply a list of ("answer", ...) / ("game", ...) rows
+- top_players(limit, order_by): all-time leaderboard rows
+- close()
+
+Usage (all-time leaderboard / writer benchmark):
+    python3 score_store.py scores.db [--top 10] [--by wins]
+    python3 score_store.py scores.db --bench 100000
+"""
+
+import argparse
+import sqlite3
+import sys
+import time
+from collections import Counter
+
+from batching import start_batch_writer, stop_batch_writer
+
+DEFAULT_FLUSH_SECONDS = 1.0
+DEFAULT_BATCH_SIZE = 512
+
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS player_stats (
+    username TEXT PRIMARY KEY,
+    games_played INTEGER NOT NULL DEFAULT 0,
+    wins INTEGER NOT NULL DEFAULT 0,
+    total_score INTEGER NOT NULL DEFAULT 0,
+    answers INTEGER NOT NULL DEFAULT 0,
+    correct_answers INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS player_stats_by_score ON player_stats (total_score DESC, username);
+CREATE INDEX IF NOT EXISTS player_stats_by_wins ON player_stats (wins DESC, username);
+
+CREATE TABLE IF NOT EXISTS game_results (
+    game_id TEXT NOT NULL,
+    username TEXT NOT NULL,
+    score INTEGER NOT NULL,
+    won INTEGER NOT NULL,
+    finished_at REAL NOT NULL,
+    PRIMARY KEY (game_id, username)
+);
+CREATE INDEX IF NOT EXISTS game_results_by_time ON game_results (finished_at);
+"""
+
+# Leaderboard orderings, each backed by one of the indexes above
+LEADERBOARD_ORDERS = {
+    "score": "total_score DESC, username",
+    "wins": "wins DESC, username",
+}
+
+
+class SqliteScoreStore:
+
+    def __init__(self, path):
+        # Written only by the batch writer thread, but opened here
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript(SQLITE_SCHEMA)
+
+    def write_batch(self, items):
+        answers = Counter()
+        correct = Counter()
+        game_rows = []
+
+        for item in items:
+            if item[0] == "answer":
+                _, username, is_correct = item
+                answers[username] += 1
+                if is_correct:
+                    correct[username] += 1
+            elif item[0] == "game":
+                game_rows.append(item[1:])
+
+        # One upsert per player per batch, however many answers it covers
+        with self.db:
+            self.db.executemany(
+                "INSERT INTO player_stats (username, answers, correct_answers) VALUES (?, ?, ?) "
+                "ON CONFLICT (username) DO UPDATE SET "
+                "answers = answers + excluded.answers, "
+                "correct_answers = correct_answers + excluded.correct_answers",
+                [(username, count, correct[username]) for username, count in answers.items()]
+            )
+            # A result already recorded for this game must not be counted again
+            new_results = []
+            for row in game_rows:
+                cursor = self.db.execute(
+                    "INSERT OR IGNORE INTO game_results (game_id, username, score, won, finished_at) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    row
+                )
+                if cursor.rowcount == 1:
+                    new_results.append(row)
+            self.db.executemany(
+                "INSERT INTO player_stats (username, games_played, wins, total_score) VALUES (?, 1, ?, ?) "
+                "ON CONFLICT (username) DO UPDATE SET "
+                "games_played = games_played + 1, "
+                "wins = wins + excluded.wins, "
+                "total_score = total_score + excluded.total_score",
+                [(username, won, score) for _, username, score, won, _ in new_results]
+            )
+
+    def top_players(self, limit=10, order_by="score"):
+        return self.db.execute(
+            "SELECT username, total_score, wins, games_played, answers, correct_answers "
+            f"FROM player_stats ORDER BY {LEADERBOARD_ORDERS[order_by]} LIMIT ?",
+            (limit,)
+        ).fetchall()
+
+    def close(self):
+        self.db.close()
+
+
+STORE_BACKENDS = {
+    "sqlite": SqliteScoreStore,
+}
+
+_store = None
+_rows = None
+_writer = None
+
+
+def open_score_store(store_config):
+    backend = store_config.get("backend", "sqlite")
+    if backend not in STORE_BACKENDS:
+        raise ValueError(f"unknown score store backend '{backend}'")
+    return STORE_BACKENDS[backend](store_config.get("path", "scores.db"))
+
+
+def start_score_store(store_config):
+    global _store, _rows, _writer
+
+    _store = open_score_store(store_config)
+    _rows, _writer = start_batch_writer(
+        _store.write_batch,
+        store_config.get("flush_seconds", DEFAULT_FLUSH_SECONDS),
+        store_config.get("batch_size", DEFAULT_BATCH_SIZE),
+        "score-store"
+    )
+
+
+def record_answer(username, is_correct):
+    if _rows is None:
+        return
+    _rows.put(("answer", username, is_correct))
+
+
+def record_game(game_id, scores):
+    """
+    Record the final scores of a game; the top score(s) count as wins.
+    scores is a list of (username, score).
+    """
+    if _rows is None or not scores:
+        return
+    max_score = max(score for _, score in scores)
+    finished_at = time.time()
+    for username, score in scores:
+        _rows.put(("game", game_id, username, score, int(score == max_score), finished_at))
+
+
+def stop_score_store():
+    global _store, _rows, _writer
+
+    if _rows is None:
+        return
+    stop_batch_writer(_rows, _writer)
+    _store.close()
+    _store = None
+    _rows = None
+    _writer = None
+
+
+def benchmark(path, num_answers):
+    """
+    Push num_answers answers (in games of 10 players x 10 questions)
+    through the batching writer and report throughput.
+    """
+    start_score_store({"path": path})
+    start = time.monotonic()
+    enqueue_times = []
+
+    for game in range(num_answers // 100):
+        for _ in range(10):
+            for player in range(10):
+                t = time.perf_counter()
+                record_answer(f"Bench{player}", player % 2 == 0)
+                enqueue_times.append(time.perf_counter() - t)
+        record_game(f"bench-{game}", [(f"Bench{player}", 10 - player) for player in range(10)])
+
+    enqueued = time.monotonic()
+    stop_score_store()
+    done = time.monotonic()
+
+    enqueue_times.sort()
+    print(f"{len(enqueue_times)} answers: enqueue {len(enqueue_times) / (enqueued - start):,.0f}/s "
+          f"(p99 {enqueue_times[int(len(enqueue_times) * 0.99)] * 1e6:.1f} us per call), "
+          f"written {len(enqueue_times) / (done - start):,.0f}/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Trivia.NET all-time leaderboard")
+    parser.add_argument("path", help="sqlite score database")
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--by", choices=list(LEADERBOARD_ORDERS), default="score")
+    parser.add_argument("--bench", type=int, metavar="ANSWERS",
+                        help="benchmark the batching writer instead of printing the leaderboard")
+    args = parser.parse_args()
+
+    if args.bench:
+        benchmark(args.path, args.bench)
+        return
+
+    store = SqliteScoreStore(args.path)
+    rows = store.top_players(args.top, args.by)
+    store.close()
+
+    if not rows:
+        print("No games recorded", file=sys.stderr)
+    for rank, (username, total_score, wins, games, answers, correct) in enumerate(rows, start=1):
+        print(f"{rank}. {username}: {total_score} points, {wins} wins, "
+              f"{games} games, {correct}/{answers} correct")
+
+
+if __name__ == "__main__":
+    main()
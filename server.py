@@ -9,26 +9,59 @@
 # Use it as you wish.
 
 import json
+import random
+import selectors
 import socket
 import sys
 import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Any
 
 import threading
 
 from questions import *
+from game_log import (DEFAULT_BATCH_SIZE, DEFAULT_FLUSH_SECONDS, begin_game, log_event, start_event_log,
+                      stop_event_log)
+from score_store import record_answer, record_game, start_score_store, stop_score_store
+from config_loader import (DEFAULT_POLL_SECONDS, ConfigError, current_config, load_config, set_config,
+                           start_config_watcher, stop_config_watcher)
+from profiling import (DEFAULT_SAMPLE_INTERVAL, end_game, phase, profile_directory, set_game, set_round,
+                       start_profiling, stop_profiling)
+from protocol import DEFAULT_ERROR_BUDGET, MAX_MESSAGE_BYTES, MessageError, decode_message, peek_message_type
+from spectators import (DEFAULT_BACKLOG_BYTES, DEFAULT_MAX_HANDSHAKES, add_spectator, broadcast_to_spectators,
+                        spectator_count, spectators_from, start_spectators, stop_spectators)
+from transport import (COMPRESSION, DEFAULT_COMPRESSION_THRESHOLD, deflate_frame, make_deflater,
+                       send_frames, set_low_latency, take_send_stats)
 
 players = {}
 players_lock = threading.Lock()
 config = {}
 current_correct_answer = None
+game_id = None
 
-import re
+# Every compressed frame is a broadcast that all compressing players of a
+# stream group ("full" or "deltas" leaderboards) receive in the same order,
+# so their deflate streams would be identical; one stream is kept per group
+# and each frame is compressed once per group
+broadcast_deflaters = {}
 
+# Scores as of the last LEADERBOARD_DELTA, and rounds since its last snapshot
+last_leaderboard_scores = {}
+rounds_since_snapshot = 0
+DEFAULT_SNAPSHOT_ROUNDS = 5
 
-def validate_username(username):
-    return bool(re.match(r'^[a-zA-Z0-9]+$', username))
+# Time the rounds have slipped behind their schedule so far (late question
+# starts and questions closing after their time limit)
+schedule_drift = 0.0
+DEFAULT_EARLY_CLOSE_GRACE = 1.0
+
+# Single worker that prepares round N+1 while round N's interval runs,
+# so the QUESTION broadcast has no generation/encoding work left to do
+round_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="round-prep")
+
+DEFAULT_LISTEN_BACKLOG = 128
+DEFAULT_HANDSHAKE_TIMEOUT = 5.0
 
 
 # Most of these functions have no arguments.
@@ -38,49 +71,123 @@ def validate_username(username):
 # students do not like using OOP in Python
 # Therefore, just the function names will be provided
 
-def add_player(client_socket, username):
+def add_player(client_socket, username, buffer=b"", compressed=False, deltas=False):
     with players_lock:
         players[client_socket] = {
             "username": username,
             "score": 0,
             "answered": False,
-            "disconnected": False
+            "disconnected": False,
+            # Negotiated in HI; large broadcasts are sent as DEFLATE frames
+            "compressed": compressed,
+            # Negotiated in HI; which kind of leaderboard the player gets
+            "stream": "deltas" if deltas else "full",
+            # Bytes already read past the last complete message
+            "buffer": buffer,
+            # Frames waiting to be written together with the next broadcast
+            "outbox": [],
+            # When the last broadcast finished writing to this player, and
+            # when their answer to the current question arrived
+            "sent_at": None,
+            "answered_at": None,
+            "deadline": None,
+            # Missed the last question; anything they sent late is dropped
+            "missed": False,
+            # Bad messages so far (see protocol.py), and whether the rest
+            # of an oversized message is still being skipped
+            "errors": 0,
+            "discarding": False
         }
         print(f"DEBUG: Player '{username}' added. Total players: {len(players)}", file=sys.stderr)
 
 
-def remove_player(client_socket):
+def remove_player(client_socket, reason="closed"):
     with players_lock:
-        if client_socket in players:
+        if client_socket in players and not players[client_socket]["disconnected"]:
             players[client_socket]["disconnected"] = True
+            log_event("disconnect", username=players[client_socket]["username"], reason=reason)
 
 
-def handle_player_answer(client_socket):
-    global current_correct_answer
+def read_player_lines(client_socket) -> bool:
+    """
+    Read whatever a player has sent into their buffer.
+    Returns False once the connection is closed; a final unterminated
+    message, if any, is kept in the buffer as a complete line.
+    """
+    chunk = client_socket.recv(4096)
+    max_bytes = config.get("max_message_bytes", MAX_MESSAGE_BYTES)
+    with players_lock:
+        data = players[client_socket]
+        if not chunk:
+            if data["buffer"]:
+                data["buffer"] += b"\n"
+            return False
+
+        if data["discarding"]:
+            # The kept buffer ends where the oversized line began, so only
+            # the new data can hold the rest of that line
+            _, newline, chunk = chunk.partition(b"\n")
+            data["discarding"] = not newline
+        buffer = data["buffer"] + chunk
+
+        # Don't hold on to a message that is already over the limit
+        oversized = len(buffer) - (buffer.rfind(b"\n") + 1) > max_bytes
+        if oversized:
+            buffer = buffer[:buffer.rfind(b"\n") + 1]
+            data["discarding"] = True
+        data["buffer"] = buffer
+
+    if oversized:
+        count_bad_message(client_socket, MessageError(f"message over the {max_bytes} byte limit"))
+    return True
+
+
+def count_bad_message(client_socket, error):
+    """
+    Charge a bad message to a player's error budget; the player is
+    dropped once they are over it.
+    """
+    with players_lock:
+        data = players[client_socket]
+        data["errors"] += 1
+        over_budget = data["errors"] > config.get("error_budget", DEFAULT_ERROR_BUDGET)
+        username = data["username"]
+
+    print(f"DEBUG: Bad message from '{username}': {error}", file=sys.stderr)
+    if over_budget:
+        remove_player(client_socket, "too many bad messages")
+        # Close now rather than when the game ends, so a flooding client
+        # isn't left filling the socket buffer
+        client_socket.close()
+
+
+def next_line(client_socket) -> bytes | None:
+    """
+    Take one complete message from a player's buffer, or None if there
+    isn't one yet.
+    """
+    with players_lock:
+        data = players[client_socket]
+        if b"\n" not in data["buffer"]:
+            return None
+        line, _, data["buffer"] = data["buffer"].partition(b"\n")
+    return line
 
-    try:
-        client_socket.settimeout(config["question_seconds"])
-        data = client_socket.recv(4096)
 
-        if not data:
-            remove_player(client_socket)
-            return
+def handle_player_answer(client_socket, line):
+    global current_correct_answer
 
-        message = json.loads(data.decode('utf-8'))
+    try:
+        message = decode_message(line, ("ANSWER", "BYE"),
+                                 config.get("max_message_bytes", MAX_MESSAGE_BYTES))
+    except MessageError as e:
+        count_bad_message(client_socket, e)
+        return
 
+    try:
         if message.get("message_type") == "BYE":
-            remove_player(client_socket)
-            result_msg = {
-                "message_type": "BYE"''',
-
-                "answer": is_correct,
-                "feedback": feedback
-                '''
-            }
-
-            # Send only to this client
-            json_string = json.dumps(result_msg) + "\n"
-            client_socket.sendall(json_string.encode('utf-8'))
+            # Nothing is sent back; the player is just left out from now on
+            remove_player(client_socket, "bye")
 
         if message.get("message_type") == "ANSWER":
             player_answer = message["answer"]
@@ -90,8 +197,12 @@ def handle_player_answer(client_socket):
             with players_lock:
                 if client_socket in players:
                     players[client_socket]["answered"] = True
+                    players[client_socket]["answered_at"] = time.monotonic()
                     if is_correct:
                         players[client_socket]["score"] += 1
+                    log_event("answer", username=players[client_socket]["username"],
+                              answer=player_answer, correct=is_correct)
+                    record_answer(players[client_socket]["username"], is_correct)
 
             if is_correct:
                 feedback = config["correct_answer"]
@@ -110,59 +221,233 @@ def handle_player_answer(client_socket):
             }
 
             # Send only to this client
-            json_string = json.dumps(result_msg) + "\n"
-            client_socket.sendall(json_string.encode('utf-8'))
+            result_bytes = encode_message(result_msg)
+            if config.get("result_delivery") == "batched":
+                # Written in the same call as the LEADERBOARD/FINISHED broadcast
+                with players_lock:
+                    players[client_socket]["outbox"].append(result_bytes)
+            else:
+                send_frames(client_socket, [result_bytes])
 
-    except socket.timeout:
-        # Player didn't answer in time
-        with players_lock:
-            if client_socket in players:
-                players[client_socket]["answered"] = True
     except Exception:
-        remove_player(client_socket)
+        remove_player(client_socket, "error")
+
+
+def encode_message(message_dict) -> bytes:
+    return (json.dumps(message_dict) + "\n").encode('utf-8')
 
 
 def send_to_all_players(message_dict):
-    json_string = json.dumps(message_dict) + "\n"
-    message_bytes = json_string.encode('utf-8')
+    send_bytes_to_all_players(encode_message(message_dict))
 
+
+def send_bytes_to_all_players(message_bytes):
+    with phase("send_to_all_players"):
+        queue_for_all_players(message_bytes)
+        flush_all_players()
+
+
+def queue_for_all_players(message_bytes, stream=None):
+    """
+    Queue a frame for every active player, or only for the players of one
+    stream group ("full" or "deltas"). Nothing is written until
+    flush_all_players(), so frames queued back to back reach each socket
+    in a single send call.
+    """
+    with players_lock:
+        compress = len(message_bytes) >= config.get("compression_threshold_bytes",
+                                                     DEFAULT_COMPRESSION_THRESHOLD)
+        compressed_bytes = {}
+
+        for data in players.values():
+            if data["disconnected"] or (stream is not None and data["stream"] != stream):
+                continue
+            if not (compress and data["compressed"]):
+                data["outbox"].append(message_bytes)
+                continue
+
+            group = data["stream"]
+            if group not in compressed_bytes:
+                if group not in broadcast_deflaters:
+                    broadcast_deflaters[group] = make_deflater()
+                compressed_bytes[group] = deflate_frame(broadcast_deflaters[group], message_bytes)
+            data["outbox"].append(compressed_bytes[group])
+
+
+def flush_all_players():
     with players_lock:
         for sock, data in players.items():
-            if not data["disconnected"]:
-                try:
-                    sock.sendall(message_bytes)
-                except (socket.error, OSError):
-                    data["disconnected"] = True
+            if data["disconnected"] or not data["outbox"]:
+                continue
+            try:
+                send_frames(sock, data["outbox"])
+                data["sent_at"] = time.monotonic()
+            except (socket.error, OSError):
+                data["disconnected"] = True
+                log_event("disconnect", username=data["username"], reason="send failed")
+            data["outbox"] = []
+
+
+def report_send_stats(label):
+    frames, send_calls = take_send_stats()
+    print(f"DEBUG: {label}: {frames} frames in {send_calls} send calls", file=sys.stderr)
+
+
+def discard_late_answers():
+    """
+    Read and drop answers that players who missed the last question sent
+    after it closed, so they aren't taken as answers to the next one.
+    A late BYE still counts.
+    """
+    with players_lock:
+        late = [sock for sock, data in players.items() if data["missed"] and not data["disconnected"]]
+
+    for sock in late:
+        try:
+            sock.setblocking(False)
+            try:
+                while read_player_lines(sock):
+                    pass
+            except BlockingIOError:
+                pass
+            finally:
+                sock.setblocking(True)
+        except OSError:
+            remove_player(sock, "error")
+            continue
+
+        while (line := next_line(sock)) is not None:
+            if peek_message_type(line) == "BYE":
+                handle_player_answer(sock, line)
+            else:
+                print(f"DEBUG: Dropped late message from '{players[sock]['username']}'", file=sys.stderr)
+
+        with players_lock:
+            players[sock]["missed"] = False
+
 
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def receive_answers(question_number, broadcast_start):
+    """
+    Wait for every active player to answer, on one selector.
+
+    Each player's time limit runs from when the QUESTION was actually
+    written to their socket (compensate_send_skew, on by default), so the
+    players at the end of a slow broadcast don't lose time. With
+    early_close_fraction set, the question closes early_close_grace_seconds
+    after that fraction of players has answered, if that is sooner.
+    Returns the time.monotonic() the question closed.
+    """
+    global schedule_drift
+
+    compensate = config.get("compensate_send_skew", True)
+    early_close_fraction = config.get("early_close_fraction")
+    early_close_grace = config.get("early_close_grace_seconds", DEFAULT_EARLY_CLOSE_GRACE)
 
-def receive_answers():
     with players_lock:
-        active_sockets = [sock for sock, data in players.items() if not data["disconnected"]]
-        # Reset answered flags
-        for data in players.values():
+        active = {sock: data for sock, data in players.items() if not data["disconnected"]}
+        for data in active.values():
             data["answered"] = False
+            data["answered_at"] = None
+            sent_at = data["sent_at"] if compensate else broadcast_start
+            data["deadline"] = sent_at + config["question_seconds"]
+
+    scheduled_close = max((data["deadline"] for data in active.values()),
+                          default=broadcast_start + config["question_seconds"])
+    close_at = scheduled_close
+    close_reason = "time limit"
+
+    # Only players still waiting for this question are watched; anything
+    # the others send stays in the socket until it is their turn again
+    selector = selectors.DefaultSelector()
+
+    def handle_lines(sock):
+        # One answer per question; later lines wait for the next one
+        while not active[sock]["answered"] and not active[sock]["disconnected"]:
+            line = next_line(sock)
+            if line is None:
+                return
+            handle_player_answer(sock, line)
 
-    # Create threads
-    threads = []
-    for sock in active_sockets:
-        t = threading.Thread(target=handle_player_answer, args=(sock,))
-        t.start()
-        threads.append(t)
+    try:
+        # Answers sent ahead of the QUESTION are already buffered
+        for sock in active:
+            handle_lines(sock)
+            if not active[sock]["answered"] and not active[sock]["disconnected"]:
+                selector.register(sock, selectors.EVENT_READ)
+
+        while True:
+            now = time.monotonic()
+            for data in active.values():
+                if not data["answered"] and not data["disconnected"] and data["deadline"] <= now:
+                    # Player didn't answer in time
+                    data["answered"] = True
+                    data["missed"] = True
+
+            for key in list(selector.get_map().values()):
+                if active[key.fileobj]["answered"] or active[key.fileobj]["disconnected"]:
+                    selector.unregister(key.fileobj)
+
+            waiting = [sock for sock, data in active.items()
+                       if not data["answered"] and not data["disconnected"]]
+            if not waiting:
+                if not any(data["missed"] for data in active.values()):
+                    close_reason = "all answered"
+                break
 
-    start_time = time.time()
-    while time.time() - start_time < config["question_seconds"]:
-        with players_lock:
-            active_players = [data for sock, data in players.items() if not data["disconnected"]]
-            if all(data["answered"] for data in active_players):
+            answered = sum(1 for data in active.values() if data["answered_at"] is not None)
+            if (early_close_fraction is not None and answered >= early_close_fraction * len(active)
+                    and now + early_close_grace < close_at):
+                close_at = now + early_close_grace
+                close_reason = "early close"
+            if now >= close_at:
                 break
-        time.sleep(0.1)
 
-    remaining_time = config["question_seconds"] - (time.time() - start_time)
-    for t in threads:
-        if remaining_time > 0:
-            t.join(timeout=max(0.1, remaining_time))
-        else:
-            t.join(timeout=0.1)
+            timeout = min([close_at] + [active[sock]["deadline"] for sock in waiting]) - now
+            for key, _ in selector.select(max(0.0, timeout)):
+                sock = key.fileobj
+                if active[sock]["disconnected"] or active[sock]["answered"]:
+                    continue
+                try:
+                    still_open = read_player_lines(sock)
+                except OSError:
+                    remove_player(sock, "error")
+                    continue
+                handle_lines(sock)
+                if not still_open:
+                    remove_player(sock)
+    finally:
+        selector.close()
+
+    closed_at = time.monotonic()
+    with players_lock:
+        for data in active.values():
+            if not data["answered"] and not data["disconnected"]:
+                # Cut off by an early close
+                data["answered"] = True
+                data["missed"] = True
+
+    arrivals = [data["answered_at"] - data["sent_at"] for data in active.values()
+                if data["answered_at"] is not None]
+    overshoot = max(0.0, closed_at - close_at) if close_reason != "all answered" else 0.0
+    schedule_drift += overshoot
+    if arrivals:
+        arrival_text = (f"p50 {percentile(arrivals, 0.5) * 1000:.1f} ms, "
+                        f"p90 {percentile(arrivals, 0.9) * 1000:.1f} ms, "
+                        f"max {max(arrivals) * 1000:.1f} ms")
+    else:
+        arrival_text = "no answers"
+    print(f"DEBUG: Question {question_number} closed ({close_reason}) after "
+          f"{closed_at - broadcast_start:.3f} s of {scheduled_close - broadcast_start:.3f} s; "
+          f"{len(arrivals)}/{len(active)} answered, {arrival_text}; "
+          f"overshoot {overshoot * 1000:.3f} ms, schedule drift {schedule_drift * 1000:.3f} ms",
+          file=sys.stderr)
+
+    return closed_at
 
 
 def generate_leaderboard_state() -> str:
@@ -193,7 +478,53 @@ def generate_leaderboard_state() -> str:
     return "\n".join(lines)
 
 
-def generate_question(question_type: str) -> dict[str, Any]:
+def generate_leaderboard_delta() -> dict[str, Any]:
+    """
+    Build a LEADERBOARD_DELTA message: the scores that changed and the
+    players that left since the last one. Every
+    leaderboard_snapshot_rounds rounds (and the first time) it is a
+    snapshot of all scores instead. Clients rebuild the same text as
+    generate_leaderboard_state() from it.
+    """
+    global last_leaderboard_scores, rounds_since_snapshot
+
+    with players_lock:
+        scores = {
+            data["username"]: data["score"]
+            for sock, data in players.items()
+            if not data["disconnected"]
+        }
+
+    snapshot = (not last_leaderboard_scores
+                or rounds_since_snapshot >= config.get("leaderboard_snapshot_rounds", DEFAULT_SNAPSHOT_ROUNDS))
+
+    if snapshot:
+        message = {
+            "message_type": "LEADERBOARD_DELTA",
+            "snapshot": True,
+            "changes": scores,
+            "removed": [],
+            "points_nouns": [config["points_noun_singular"], config["points_noun_plural"]]
+        }
+        rounds_since_snapshot = 0
+    else:
+        message = {
+            "message_type": "LEADERBOARD_DELTA",
+            "snapshot": False,
+            "changes": {
+                username: score
+                for username, score in scores.items()
+                if last_leaderboard_scores.get(username) != score
+            },
+            "removed": [username for username in last_leaderboard_scores if username not in scores]
+        }
+
+    rounds_since_snapshot += 1
+    last_leaderboard_scores = scores
+    return message
+
+
+def generate_question(question_type: str, rng=random) -> dict[str, Any]:
     generators = {
         "Mathematics": generate_mathematics_question,
         "Roman Numerals": generate_roman_numerals_question,
@@ -202,7 +533,7 @@ def generate_question(question_type: str) -> dict[str, Any]:
     }
 
     generator = generators[question_type]
-    short_question = generator()
+    short_question = generator(rng)
 
     return {
         "short_question": short_question,
@@ -321,7 +652,11 @@ def int_to_ip(ip_int):
            f"{(ip_int >> 8) & 0xFF}.{ip_int & 0xFF}"
 
 
-def start_game():
+def start_game() -> float:
+    """
+    Send READY and return the time.monotonic() deadline at which the
+    first question should be broadcast.
+    """
     ready_msg = {
         "message_type": "READY",
         "info": config["ready_info"].format(
@@ -329,47 +664,122 @@ def start_game():
         )
     }
     send_to_all_players(ready_msg)
-    time.sleep(config["question_interval_seconds"])
-
+    log_event("ready")
+    return time.monotonic() + config["question_interval_seconds"]
 
-def start_round(question_number: int, question_type: str):
-    global current_correct_answer
 
-    question_data = generate_question(question_type)
-    short_question = question_data["short_question"]
-
-    current_correct_answer = generate_question_answer(question_type, short_question)
-    try:
-        question_format = config["question_formats"][question_type]
-    except KeyError:
-        print(f"DEBUG: Missing question format for '{question_type}'", file=sys.stderr)
-        print(f"DEBUG: Available formats: {list(config['question_formats'].keys())}", file=sys.stderr)
-        question_format = "{0}"  # Fallback format
+def prepare_round(question_number: int, question_type: str, rng) -> dict[str, Any]:
+    """
+    Do all the work for a round ahead of time: generate and solve the
+    question and pre-encode the QUESTION message.
+    Runs on round_executor during the previous round's interval.
+    """
+    with phase("prepare_round", question_number):
+        question_data = generate_question(question_type, rng)
+        short_question = question_data["short_question"]
 
-    formatted_question = question_format.format(short_question)
-
-    trivia_question = f"{config['question_word']} {question_number} ({question_type}):\n{formatted_question}"
+        correct_answer = generate_question_answer(question_type, short_question)
+        try:
+            question_format = config["question_formats"][question_type]
+        except KeyError:
+            print(f"DEBUG: Missing question format for '{question_type}'", file=sys.stderr)
+            print(f"DEBUG: Available formats: {list(config['question_formats'].keys())}", file=sys.stderr)
+            question_format = "{0}"  # Fallback format
+
+        formatted_question = question_format.format(short_question)
+
+        trivia_question = f"{config['question_word']} {question_number} ({question_type}):\n{formatted_question}"
+
+        question_msg = {
+            "message_type": "QUESTION",
+            "question_type": question_type,
+            "trivia_question": trivia_question,
+            "short_question": short_question,
+            "time_limit": config["question_seconds"]
+        }
 
-    question_msg = {
-        "message_type": "QUESTION",
-        "question_type": question_type,
-        "trivia_question": trivia_question,
-        "short_question": short_question,
-        "time_limit": config["question_seconds"]
-    }
-    send_to_all_players(question_msg)
+        return {
+            "question_number": question_number,
+            "question_type": question_type,
+            "short_question": short_question,
+            "correct_answer": correct_answer,
+            "message_bytes": encode_message(question_msg)
+        }
 
-    receive_answers()
 
+def wait_until(deadline: float):
+    # time.sleep() tends to overshoot by a few hundred microseconds,
+    # so sleep most of the way and spin for the last couple of ms
+    remaining = deadline - time.monotonic()
+    if remaining > 0.002:
+        time.sleep(remaining - 0.002)
+    while time.monotonic() < deadline:
+        pass
+
+
+def start_round(prepared_round: dict[str, Any], scheduled_start: float):
+    global current_correct_answer, schedule_drift
+
+    with phase("wait"):
+        wait_until(scheduled_start)
+    # Only now, right before the QUESTION goes out: a player who was cut off
+    # may still be sending their old answer during the pause
+    discard_late_answers()
+
+    broadcast_start = time.monotonic()
+    current_correct_answer = prepared_round["correct_answer"]
+    send_bytes_to_all_players(prepared_round["message_bytes"])
+    broadcast_end = time.monotonic()
+    broadcast_to_spectators(prepared_round["message_bytes"])
+    log_event("question", number=prepared_round["question_number"],
+              question_type=prepared_round["question_type"],
+              short_question=prepared_round["short_question"],
+              correct_answer=prepared_round["correct_answer"])
+    report_send_stats(f"Up to question {prepared_round['question_number']}")
 
-def end_round(is_last_round):
+    with players_lock:
+        sent = [data["sent_at"] for data in players.values()
+                if not data["disconnected"] and data["sent_at"] is not None]
+    send_skew = max(sent) - min(sent) if sent else 0.0
+    schedule_drift += broadcast_start - scheduled_start
+
+    print(f"DEBUG: Question {prepared_round['question_number']} start jitter: "
+          f"{(broadcast_start - scheduled_start) * 1000:.3f} ms, "
+          f"broadcast took {(broadcast_end - broadcast_start) * 1000:.3f} ms, "
+          f"send skew {send_skew * 1000:.3f} ms", file=sys.stderr)
+
+    with phase("receive_answers"):
+        receive_answers(prepared_round["question_number"], broadcast_start)
+
+
+def end_round(is_last_round) -> float | None:
+    """
+    Send LEADERBOARD (or FINISHED on the last round).
+    Returns the time.monotonic() deadline for the next question, or None
+    after the last round.
+    """
     if not is_last_round:
-        leaderboard_msg = {
-            "message_type": "LEADERBOARD",
-            "state": generate_leaderboard_state()
-        }
-        send_to_all_players(leaderboard_msg)
-        time.sleep(config["question_interval_seconds"])
+        with players_lock:
+            streams = {data["stream"] for data in players.values() if not data["disconnected"]}
+
+        # The full text is only built if someone still needs it
+        # (spectators always get the full leaderboard)
+        if "full" in streams or spectator_count():
+            leaderboard_msg = {
+                "message_type": "LEADERBOARD",
+                "state": generate_leaderboard_state()
+            }
+            leaderboard_bytes = encode_message(leaderboard_msg)
+            if "full" in streams:
+                queue_for_all_players(leaderboard_bytes, "full")
+            broadcast_to_spectators(leaderboard_bytes)
+        if "deltas" in streams:
+            queue_for_all_players(encode_message(generate_leaderboard_delta()), "deltas")
+        # With no interval the next QUESTION follows immediately, so leave
+        # LEADERBOARD queued and let start_round send both together
+        if config["question_interval_seconds"] > 0:
+            flush_all_players()
+        return time.monotonic() + config["question_interval_seconds"]
     else:
         state = generate_leaderboard_state()
         with players_lock:
@@ -398,7 +808,310 @@ def end_round(is_last_round):
             "message_type": "FINISHED",
             "final_standings": final_standings
         }
-        send_to_all_players(finished_msg)
+        finished_bytes = encode_message(finished_msg)
+        send_bytes_to_all_players(finished_bytes)
+        broadcast_to_spectators(finished_bytes)
+        report_send_stats("Up to the end of the game")
+        log_event("game_end", scores=dict(active_players))
+        record_game(game_id, active_players)
+        return None
+
+
+def parse_handshake(buffer: bytes) -> tuple[dict[str, Any], bytes] | None:
+    """
+    Try to pull a complete HI or SPECTATE message off the front of a
+    handshake buffer.
+    Returns (message, leftover bytes) or None if more data is needed.
+    Raises ValueError for anything that can never become a valid handshake.
+    """
+    max_bytes = config.get("max_message_bytes", MAX_MESSAGE_BYTES)
+    if b"\n" in buffer:
+        line, _, rest = buffer.partition(b"\n")
+    elif len(buffer) > max_bytes:
+        raise MessageError("handshake too large")
+    else:
+        # Older clients may send HI without a trailing newline
+        if not buffer.rstrip().endswith(b"}"):
+            return None
+        try:
+            json.loads(buffer)
+        except ValueError:
+            return None
+        line, rest = buffer, b""
+
+    return decode_message(line, ("HI", "SPECTATE"), max_bytes), rest
+
+
+def admit_players(server_socket, joiners=()):
+    """
+    Accept connections until config["players"] players have sent HI.
+    All handshakes are read through one selector, so a client that never
+    sends HI only holds its own connection. Handshakes that fail or time
+    out are evicted and their slot is refilled by the next connection.
+    Clients that send SPECTATE join the spectators instead and don't take
+    a player slot. joiners are connections kept from the previous game
+    (see stop_spectators()); they are admitted first.
+    Returns ({ip: number of players admitted from it}, handshakes still in
+    progress as (socket, address, bytes received, deadline)), the latter
+    for start_spectators().
+    """
+    handshake_timeout = config.get("handshake_timeout_seconds", DEFAULT_HANDSHAKE_TIMEOUT)
+    max_per_ip = config.get("max_connections_per_ip")
+    max_spectators = config.get("max_spectators")
+    max_handshakes = config.get("max_pending_handshakes", DEFAULT_MAX_HANDSHAKES)
+
+    selector = selectors.DefaultSelector()
+    server_socket.setblocking(False)
+    selector.register(server_socket, selectors.EVENT_READ)
+
+    # socket -> {"address", "buffer", "deadline"} for handshakes in progress
+    pending = {}
+    # ip -> handshakes and players from it (spectators are counted by spectators.py)
+    connections_per_ip = {}
+
+    def connections_from(ip):
+        return connections_per_ip.get(ip, 0) + spectators_from(ip)
+
+    def evict(sock, reason):
+        selector.unregister(sock)
+        handshake = pending.pop(sock)
+        connections_per_ip[handshake["address"][0]] -= 1
+        print(f"DEBUG: Evicting {handshake['address']}: {reason}", file=sys.stderr)
+        log_event("evict", address=handshake["address"][0], reason=str(reason))
+        sock.close()
+
+    def accept_connections():
+        while True:
+            try:
+                client_sock, addr = server_socket.accept()
+            except (BlockingIOError, InterruptedError):
+                return
+
+            ip = addr[0]
+            if len(pending) >= max_handshakes:
+                print(f"DEBUG: Rejecting {addr}: too many connections waiting", file=sys.stderr)
+                client_sock.close()
+                continue
+            if max_per_ip and connections_from(ip) >= max_per_ip:
+                print(f"DEBUG: Rejecting {addr}: too many connections from {ip}", file=sys.stderr)
+                client_sock.close()
+                continue
+
+            connections_per_ip[ip] = connections_per_ip.get(ip, 0) + 1
+            client_sock.setblocking(False)
+            pending[client_sock] = {
+                "address": addr,
+                "buffer": b"",
+                "deadline": time.monotonic() + handshake_timeout
+            }
+            selector.register(client_sock, selectors.EVENT_READ)
+
+    def read_handshake(sock):
+        handshake = pending[sock]
+        try:
+            chunk = sock.recv(4096)
+        except (BlockingIOError, InterruptedError):
+            return
+        except OSError as e:
+            evict(sock, e)
+            return
+
+        if not chunk:
+            evict(sock, "closed during handshake")
+            return
+
+        handshake["buffer"] += chunk
+        try_handshake(sock)
+
+    def try_handshake(sock):
+        handshake = pending[sock]
+        try:
+            parsed = parse_handshake(handshake["buffer"])
+        except ValueError as e:
+            evict(sock, e)
+            return
+        if parsed is None:
+            return
+
+        message, rest = parsed
+        if message["message_type"] == "SPECTATE":
+            if not config.get("spectators", True):
+                evict(sock, "spectators are not allowed")
+                return
+            if max_spectators is not None and spectator_count() >= max_spectators:
+                evict(sock, "too many spectators")
+                return
+            selector.unregister(sock)
+            del pending[sock]
+            connections_per_ip[handshake["address"][0]] -= 1
+            set_low_latency(sock)
+            add_spectator(sock, handshake["address"])
+            return
+
+        compressed = message.get("compression") == COMPRESSION and config.get("compression", True)
+        deltas = message.get("leaderboard_deltas") is True and config.get("leaderboard_deltas", True)
+        if len(players) >= config["players"]:
+            # Left pending; the spectator thread decides (next game or not)
+            return
+        # Standings and leaderboard deltas are keyed by username
+        with players_lock:
+            taken = any(data["username"] == message["username"] for data in players.values())
+        if taken:
+            evict(sock, f"username '{message['username']}' is already taken")
+            return
+
+        selector.unregister(sock)
+        del pending[sock]
+        sock.setblocking(True)
+        set_low_latency(sock)
+        add_player(sock, message["username"], rest, compressed, deltas)
+        log_event("connect", username=message["username"], address=handshake["address"][0])
+
+    for sock, addr, buffer in joiners:
+        # Kept connections go through the same limit as fresh ones
+        if max_per_ip and connections_from(addr[0]) >= max_per_ip:
+            print(f"DEBUG: Rejecting {addr}: too many connections from {addr[0]}", file=sys.stderr)
+            sock.close()
+            continue
+        connections_per_ip[addr[0]] = connections_per_ip.get(addr[0], 0) + 1
+        pending[sock] = {
+            "address": addr,
+            "buffer": buffer,
+            "deadline": time.monotonic() + handshake_timeout
+        }
+        selector.register(sock, selectors.EVENT_READ)
+        if buffer:
+            try_handshake(sock)
+
+    try:
+        while len(players) < config["players"]:
+            now = time.monotonic()
+            for sock in [sock for sock, handshake in pending.items() if handshake["deadline"] <= now]:
+                evict(sock, "handshake timed out")
+
+            timeout = None
+            if pending:
+                timeout = max(0.0, min(handshake["deadline"] for handshake in pending.values()) - now)
+
+            for key, _ in selector.select(timeout):
+                if key.fileobj is server_socket:
+                    accept_connections()
+                elif key.fileobj in pending:
+                    read_handshake(key.fileobj)
+    except BaseException:
+        for sock in list(pending):
+            evict(sock, "admission failed")
+        raise
+    finally:
+        selector.close()
+        server_socket.setblocking(True)
+
+    # Whoever is still handshaking (a SPECTATE on its way, or an HI for the
+    # next game) is handed to the spectator thread rather than cut off
+    handshakes = []
+    for sock, handshake in pending.items():
+        connections_per_ip[handshake["address"][0]] -= 1
+        handshakes.append((sock, handshake["address"], handshake["buffer"], handshake["deadline"]))
+    return connections_per_ip, handshakes
+
+
+def reset_game_state():
+    """
+    Forget everything about the previous game's players.
+    """
+    global current_correct_answer, rounds_since_snapshot, schedule_drift
+
+    with players_lock:
+        players.clear()
+    broadcast_deflaters.clear()
+    last_leaderboard_scores.clear()
+    rounds_since_snapshot = 0
+    schedule_drift = 0.0
+    current_correct_answer = None
+
+
+def run_game(server_socket, game_config, joiners=(), more_games=False, game_number=0):
+    """
+    Play game_number (counting from 0) on the listening socket with the
+    config snapshot it was given; a reload during the game only affects
+    the next one.
+    joiners are connections kept from the previous game. With more_games,
+    returns the ones that arrived during this game for the next.
+    """
+    global config, game_id
+
+    config = game_config
+    reset_game_state()
+    set_game(game_number)
+
+    # Each question type gets its own stream derived from the game seed,
+    # so a seed from the config (or the event log) reproduces the game
+    game_seed = config.get("seed")
+    if game_seed is None:
+        game_seed = random.randrange(2 ** 32)
+    elif game_number:
+        # A fixed seed still gives every game different questions; the
+        # game's own seed is logged, so a replay needs nothing else
+        game_seed = derive_rng(game_seed, game_number).randrange(2 ** 32)
+    question_rngs = {
+        question_type: derive_rng(game_seed, question_type)
+        for question_type in config["question_types"]
+    }
+    game_id = begin_game()
+    log_event("game_start", seed=game_seed, players=config["players"],
+              question_types=config["question_types"])
+
+    player_ips, handshakes = admit_players(server_socket, joiners)
+    # From here on the listening socket only takes spectators (and players
+    # for the next game)
+    start_spectators(
+        server_socket if config.get("spectators", True) or more_games else None,
+        parse_handshake,
+        config.get("handshake_timeout_seconds", DEFAULT_HANDSHAKE_TIMEOUT),
+        config.get("spectator_backlog_bytes", DEFAULT_BACKLOG_BYTES),
+        allow_spectators=config.get("spectators", True),
+        keep_joiners=more_games,
+        player_ips=player_ips,
+        max_per_ip=config.get("max_connections_per_ip"),
+        max_spectators=config.get("max_spectators"),
+        max_handshakes=config.get("max_pending_handshakes", DEFAULT_MAX_HANDSHAKES),
+        handshakes=handshakes
+    )
+
+    try:
+        question_types = config["question_types"]
+        num_questions = len(question_types)
+
+        # Round 1 is prepared while the READY interval runs
+        next_round = round_executor.submit(prepare_round, 1, question_types[0],
+                                           question_rngs[question_types[0]])
+        with phase("start_game"):
+            next_start = start_game()
+
+        for i in range(num_questions):
+            is_last = (i == num_questions - 1)
+            prepared_round = next_round.result()
+            if not is_last:
+                next_round = round_executor.submit(prepare_round, i + 2, question_types[i + 1],
+                                                   question_rngs[question_types[i + 1]])
+            set_round(i + 1)
+            start_round(prepared_round, next_start)
+            with phase("end_round"):
+                next_start = end_round(is_last)
+    except Exception as e:
+        print(f"DEBUG: Error in game loop: {e}", file=sys.stderr)
+    finally:
+        # Close all connections
+        joiners = stop_spectators()
+        with players_lock:
+            for sock in list(players.keys()):
+                try:
+                    sock.close()
+                except (socket.error, OSError):
+                    pass
+        end_game()
+
+    return joiners
 
 
 def main():
@@ -427,97 +1140,61 @@ def main():
         sys.exit(1)
 
     try:
-        with open(config_path) as f:
-            config = json.load(f)
-    except json.JSONDecodeError as e:
-        print(f"server.py: Invalid JSON in config file", file=sys.stderr)
-        sys.exit(1)
-    except Exception as e:
-        print(f"server.py: Error loading config: {e}", file=sys.stderr)
+        config = load_config(config_path)
+    except ConfigError as e:
+        print(f"server.py: {e}", file=sys.stderr)
         sys.exit(1)
-
-    required_fields = [
-        "port", "players", "question_types", "question_formats",
-        "question_seconds", "question_interval_seconds", "ready_info",
-        "question_word", "correct_answer", "incorrect_answer",
-        "points_noun_singular", "points_noun_plural",
-        "final_standings_heading", "one_winner", "multiple_winners"
-    ]
-    for field in required_fields:
-        if field not in config:
-            print(f"server.py: Missing required field '{field}' in config", file=sys.stderr)
-            sys.exit(1)
+    set_config(config_path, config)
 
     try:
         server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
         server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
         server_socket.bind(('0.0.0.0', config["port"]))
-        server_socket.listen()
+        server_socket.listen(config.get("listen_backlog", DEFAULT_LISTEN_BACKLOG))
     except OSError:
         print(f"server.py: Binding to port {config['port']} was unsuccessful", file=sys.stderr)
         sys.exit(1)
 
-    def handle_client_connection(client_sock):
-        client_sock.settimeout(5.0)
-        try:
-            client_sock.settimeout(5.0)
-            data = client_sock.recv(4096)
-            if not data:
-                client_sock.close()
-                return
-
-            message = json.loads(data.decode('utf-8'))
-            if message.get("message_type") != "HI":
-                client_sock.close()
-                return
-
-            username = message["username"]
-            '''
-            # Check alphanumeric
-            if not username.isalnum():
-                client_sock.close()
-                return
-
-            '''
-
-            add_player(client_sock, username)
-        except Exception as e:
-            print(f"DEBUG: Error in handle_client_connection: {e}", file=sys.stderr)
-            # print(f"Error adding player: {e}", file=sys.stderr)
-            client_sock.close()
+    # Port 0 lets the OS pick a free port; report the real one
+    print(f"DEBUG: Listening on port {server_socket.getsockname()[1]}", file=sys.stderr, flush=True)
 
-    threads = []
-    for _ in range(config["players"]):
-        client_sock, addr = server_socket.accept()
-        t = threading.Thread(target=handle_client_connection, args=(client_sock,))
-        t.start()
-        threads.append(t)
+    if config.get("event_log"):
+        start_event_log(
+            config["event_log"],
+            config.get("event_log_flush_seconds", DEFAULT_FLUSH_SECONDS),
+            config.get("event_log_batch_size", DEFAULT_BATCH_SIZE)
+        )
+    if config.get("score_store"):
+        start_score_store(config["score_store"])
+    if profile_directory(config):
+        start_profiling(
+            profile_directory(config),
+            config.get("profile_sample_interval_seconds", DEFAULT_SAMPLE_INTERVAL),
+            config.get("profile_allocations", True)
+        )
 
-    for t in threads:
-        t.join()
+    # Edits to the config file (or SIGHUP) apply from the next game on
+    start_config_watcher(config.get("config_poll_seconds", DEFAULT_POLL_SECONDS))
 
     try:
-        start_game()
-
-        num_questions = len(config["question_types"])
-
-        for i, question_type in enumerate(config["question_types"]):
-            question_number = i + 1
-            is_last = (i == num_questions - 1)
-            start_round(question_number, question_type)
-            end_round(is_last)
-    except Exception as e:
-        print(f"DEBUG: Error in game loop: {e}", file=sys.stderr)
+        # "games": 0 keeps starting new games until the server is stopped
+        games_played = 0
+        joiners = []
+        while True:
+            game_config = current_config()
+            games = game_config.get("games", 1)
+            more_games = not games or games_played + 1 < games
+            joiners = run_game(server_socket, game_config, joiners, more_games, games_played)
+            games_played += 1
+            if not more_games:
+                break
     finally:
-        # Close all connections
-        with players_lock:
-            for sock in list(players.keys()):
-                try:
-                    sock.close()
-                except (socket.error, OSError):
-                    pass
-
+        stop_config_watcher()
         server_socket.close()
+        round_executor.shutdown(wait=False)
+        stop_event_log()
+        stop_score_store()
+        stop_profiling()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,403 @@
+"""
+Spectator fan-out for Trivia.NET
+
+A client that sends {"message_type": "SPECTATE"} instead of HI watches
+the game without playing: it gets every QUESTION, the full LEADERBOARD
+after each round and FINISHED, and nothing else. Spectators are not
+players, so they never show up in standings or in receive_answers().
+
+Everything spectator related runs on one thread with its own selector:
+- the game loop hands it each broadcast with broadcast_to_spectators(),
+  which only puts the already encoded bytes on a queue
+- the same bytes object is written to every spectator (partial writes
+  keep a memoryview of the rest, so nothing is copied per spectator)
+- sockets are non-blocking; a spectator that falls more than
+  backlog_bytes behind is dropped rather than slowing anyone down
+- once the game has started the thread also owns the listening socket,
+  so spectators can keep joining; a joiner first gets the latest
+  broadcast so it has something to show. Handshakes still in progress
+  when admission ends are finished here too.
+
+When another game follows, players who connect while this one runs are
+kept (with whatever they have sent) and handed back by stop_spectators()
+for the next game's admission instead of being turned away.
+
+The thread applies the same limits as admission: at most max_per_ip
+connections from one address (counting the game's players, spectators
+and connections held here), at most max_spectators spectators and at
+most max_handshakes connections held open that haven't become
+spectators (handshakes in progress plus players kept for the next game).
+"""
+
+import queue
+import selectors
+import socket
+import sys
+import threading
+import time
+from collections import deque
+
+from game_log import log_event
+
+DEFAULT_BACKLOG_BYTES = 256 * 1024
+DEFAULT_MAX_HANDSHAKES = 256
+# How long FINISHED gets to reach spectators when the game ends
+STOP_GRACE_SECONDS = 1.0
+
+# Marks the end of the broadcast queue
+_STOP = object()
+
+# socket -> {"address", "outbox": deque of memoryviews, "queued": bytes in outbox}
+_spectators = {}
+# ip -> number of spectators connected from it
+_spectators_per_ip = {}
+_broadcasts = queue.SimpleQueue()
+_wakeup_reader = None
+_wakeup_writer = None
+_thread = None
+# (socket, address, bytes received) of connections kept for the next game
+_joiners = []
+
+
+def add_spectator(sock, address):
+    """
+    Subscribe a socket that has sent SPECTATE. Before start_spectators()
+    this is called from the admission loop, afterwards only from the
+    spectator thread.
+    """
+    sock.setblocking(False)
+    _spectators[sock] = {"address": address, "outbox": deque(), "queued": 0}
+    _spectators_per_ip[address[0]] = _spectators_per_ip.get(address[0], 0) + 1
+    print(f"DEBUG: Spectator {address} added. Total spectators: {len(_spectators)}", file=sys.stderr)
+    log_event("spectate", address=address[0])
+
+
+def spectator_count():
+    return len(_spectators)
+
+
+def spectators_from(ip):
+    return _spectators_per_ip.get(ip, 0)
+
+
+def broadcast_to_spectators(message_bytes):
+    """
+    Send an encoded frame to every spectator. Returns straight away; the
+    spectator thread does the writing.
+    """
+    if _thread is None:
+        return
+    _broadcasts.put(message_bytes)
+    try:
+        _wakeup_writer.send(b"\0")
+    except BlockingIOError:
+        # Already woken up and not yet drained
+        pass
+
+
+def _forget(sock):
+    spectator = _spectators.pop(sock)
+    ip = spectator["address"][0]
+    _spectators_per_ip[ip] -= 1
+    if not _spectators_per_ip[ip]:
+        del _spectators_per_ip[ip]
+    sock.close()
+    return spectator
+
+
+def _drop(selector, sock, reason):
+    selector.unregister(sock)
+    spectator = _forget(sock)
+    print(f"DEBUG: Dropping spectator {spectator['address']}: {reason}", file=sys.stderr)
+    log_event("spectator_drop", address=spectator["address"][0], reason=reason)
+
+
+def _write_pending(selector, sock):
+    spectator = _spectators[sock]
+    outbox = spectator["outbox"]
+    try:
+        while outbox:
+            sent = sock.send(outbox[0])
+            spectator["queued"] -= sent
+            if sent < len(outbox[0]):
+                outbox[0] = outbox[0][sent:]
+                break
+            outbox.popleft()
+    except (BlockingIOError, InterruptedError):
+        pass
+    except OSError as e:
+        _drop(selector, sock, str(e))
+        return
+
+    events = selectors.EVENT_READ | (selectors.EVENT_WRITE if outbox else 0)
+    if selector.get_key(sock).events != events:
+        selector.modify(sock, events, "spectator")
+
+
+def _queue_frame(selector, sock, frame, backlog_bytes):
+    spectator = _spectators[sock]
+    if not spectator["outbox"]:
+        # Usual case: nothing pending, so try to write the whole frame now
+        try:
+            sent = sock.send(frame)
+        except (BlockingIOError, InterruptedError):
+            sent = 0
+        except OSError as e:
+            _drop(selector, sock, str(e))
+            return
+        if sent == len(frame):
+            return
+        frame = frame[sent:]
+
+    spectator["outbox"].append(frame)
+    spectator["queued"] += len(frame)
+    if spectator["queued"] > backlog_bytes:
+        _drop(selector, sock, "too far behind")
+        return
+    if len(spectator["outbox"]) == 1:
+        selector.modify(sock, selectors.EVENT_READ | selectors.EVENT_WRITE, "spectator")
+
+
+def _run_spectators(server_socket, parse_handshake, handshake_timeout, backlog_bytes,
+                    allow_spectators, keep_joiners, player_ips, max_per_ip, max_spectators,
+                    max_handshakes, handed_over):
+    selector = selectors.DefaultSelector()
+    selector.register(_wakeup_reader, selectors.EVENT_READ, "wakeup")
+    if server_socket is not None:
+        server_socket.setblocking(False)
+        selector.register(server_socket, selectors.EVENT_READ, "accept")
+    for sock in _spectators:
+        selector.register(sock, selectors.EVENT_READ, "spectator")
+
+    # socket -> {"address", "buffer", "deadline"} for joiners still handshaking
+    handshakes = {}
+    # ip -> handshakes and kept joiners from it
+    held_per_ip = {}
+    latest = None
+    stop_at = None
+
+    def connections_from(ip):
+        return player_ips.get(ip, 0) + held_per_ip.get(ip, 0) + _spectators_per_ip.get(ip, 0)
+
+    def release(handshake):
+        held_per_ip[handshake["address"][0]] -= 1
+
+    def keep_for_next_game(sock):
+        # Still held here, so it keeps counting towards the limits
+        handshake = handshakes.pop(sock)
+        selector.unregister(sock)
+        _joiners.append((sock, handshake["address"], handshake["buffer"]))
+
+    def evict(sock, reason):
+        handshake = handshakes.pop(sock)
+        release(handshake)
+        selector.unregister(sock)
+        sock.close()
+        print(f"DEBUG: Evicting {handshake['address']}: {reason}", file=sys.stderr)
+        log_event("evict", address=handshake["address"][0], reason=str(reason))
+
+    def accept_connections():
+        while True:
+            try:
+                client_sock, addr = server_socket.accept()
+            except (BlockingIOError, InterruptedError):
+                return
+            except OSError:
+                return
+
+            ip = addr[0]
+            if len(handshakes) + len(_joiners) >= max_handshakes:
+                print(f"DEBUG: Rejecting {addr}: too many connections waiting", file=sys.stderr)
+                client_sock.close()
+                continue
+            if max_per_ip and connections_from(ip) >= max_per_ip:
+                print(f"DEBUG: Rejecting {addr}: too many connections from {ip}", file=sys.stderr)
+                client_sock.close()
+                continue
+
+            held_per_ip[ip] = held_per_ip.get(ip, 0) + 1
+            client_sock.setblocking(False)
+            handshakes[client_sock] = {
+                "address": addr,
+                "buffer": b"",
+                "deadline": time.monotonic() + handshake_timeout
+            }
+            selector.register(client_sock, selectors.EVENT_READ, "handshake")
+
+    def read_handshake(sock):
+        handshake = handshakes[sock]
+        try:
+            chunk = sock.recv(4096)
+        except (BlockingIOError, InterruptedError):
+            return
+        except OSError as e:
+            evict(sock, e)
+            return
+        if not chunk:
+            evict(sock, "closed during handshake")
+            return
+
+        handshake["buffer"] += chunk
+        try_handshake(sock)
+
+    def try_handshake(sock):
+        handshake = handshakes[sock]
+        try:
+            parsed = parse_handshake(handshake["buffer"])
+        except ValueError as e:
+            evict(sock, e)
+            return
+        if parsed is None:
+            return
+        if parsed[0]["message_type"] != "SPECTATE":
+            if keep_joiners:
+                print(f"DEBUG: {handshake['address']} is waiting for the next game", file=sys.stderr)
+                keep_for_next_game(sock)
+            else:
+                evict(sock, "game already started")
+            return
+        if not allow_spectators:
+            evict(sock, "spectators are not allowed")
+            return
+        if max_spectators is not None and len(_spectators) >= max_spectators:
+            evict(sock, "too many spectators")
+            return
+
+        del handshakes[sock]
+        release(handshake)
+        selector.modify(sock, selectors.EVENT_READ, "spectator")
+        add_spectator(sock, handshake["address"])
+        if latest is not None:
+            _queue_frame(selector, sock, memoryview(latest), backlog_bytes)
+
+    def read_spectator(sock):
+        # Spectators have nothing to say; only watch for them leaving
+        try:
+            if sock.recv(4096):
+                return
+            reason = "closed"
+        except (BlockingIOError, InterruptedError):
+            return
+        except OSError as e:
+            reason = str(e)
+        _drop(selector, sock, reason)
+
+    # Handshakes admission hadn't finished go on here
+    for sock, address, buffer, deadline in handed_over:
+        sock.setblocking(False)
+        held_per_ip[address[0]] = held_per_ip.get(address[0], 0) + 1
+        handshakes[sock] = {"address": address, "buffer": buffer, "deadline": deadline}
+        selector.register(sock, selectors.EVENT_READ, "handshake")
+    for sock in [sock for sock, handshake in handshakes.items() if handshake["buffer"]]:
+        try_handshake(sock)
+
+    try:
+        while stop_at is None or (any(s["outbox"] for s in _spectators.values())
+                                  and time.monotonic() < stop_at):
+            now = time.monotonic()
+            for sock in [sock for sock, handshake in handshakes.items() if handshake["deadline"] <= now]:
+                evict(sock, "handshake timed out")
+
+            deadlines = [handshake["deadline"] for handshake in handshakes.values()]
+            if stop_at is not None:
+                deadlines.append(stop_at)
+            timeout = max(0.0, min(deadlines) - now) if deadlines else None
+
+            for key, events in selector.select(timeout):
+                sock = key.fileobj
+                if key.data == "wakeup":
+                    try:
+                        while sock.recv(4096):
+                            pass
+                    except BlockingIOError:
+                        pass
+                    while True:
+                        try:
+                            frame = _broadcasts.get_nowait()
+                        except queue.Empty:
+                            break
+                        if frame is _STOP:
+                            stop_at = time.monotonic() + STOP_GRACE_SECONDS
+                            continue
+                        latest = frame
+                        # One view shared by every spectator
+                        view = memoryview(frame)
+                        for spectator_sock in list(_spectators):
+                            _queue_frame(selector, spectator_sock, view, backlog_bytes)
+                elif key.data == "accept":
+                    if stop_at is None:
+                        accept_connections()
+                elif key.data == "handshake":
+                    if sock in handshakes:
+                        read_handshake(sock)
+                elif sock in _spectators:
+                    if events & selectors.EVENT_WRITE:
+                        _write_pending(selector, sock)
+                    if events & selectors.EVENT_READ and sock in _spectators:
+                        read_spectator(sock)
+    finally:
+        for sock in list(handshakes):
+            if keep_joiners:
+                keep_for_next_game(sock)
+            else:
+                evict(sock, "game over")
+        for sock in list(_spectators):
+            _forget(sock)
+        if server_socket is not None:
+            selector.unregister(server_socket)
+            server_socket.setblocking(True)
+        selector.close()
+
+
+def start_spectators(server_socket, parse_handshake, handshake_timeout,
+                     backlog_bytes=DEFAULT_BACKLOG_BYTES, allow_spectators=True, keep_joiners=False,
+                     player_ips=None, max_per_ip=None, max_spectators=None,
+                     max_handshakes=DEFAULT_MAX_HANDSHAKES, handshakes=()):
+    """
+    Start the spectator thread. It takes over server_socket (None to not
+    accept anyone) until stop_spectators(); parse_handshake is used on
+    whatever late joiners send. With keep_joiners, players who join
+    meanwhile are kept for the next game. player_ips ({ip: players}) is
+    counted towards max_per_ip. handshakes are the (socket, address,
+    bytes received, deadline) of connections still handshaking when
+    admission ended; they are carried on as if they had joined late.
+    """
+    global _wakeup_reader, _wakeup_writer, _thread
+
+    _wakeup_reader, _wakeup_writer = socket.socketpair()
+    _wakeup_reader.setblocking(False)
+    _wakeup_writer.setblocking(False)
+    _thread = threading.Thread(
+        target=_run_spectators,
+        args=(server_socket, parse_handshake, handshake_timeout, backlog_bytes,
+              allow_spectators, keep_joiners, dict(player_ips or {}), max_per_ip, max_spectators,
+              max_handshakes, list(handshakes)),
+        name="spectators",
+        daemon=True
+    )
+    _thread.start()
+
+
+def stop_spectators():
+    """
+    Give queued frames (FINISHED) a moment to go out, then disconnect
+    every spectator and hand the listening socket back.
+    Returns the (socket, address, bytes received) of connections kept for
+    the next game.
+    """
+    global _wakeup_reader, _wakeup_writer, _thread, _joiners
+
+    if _thread is None:
+        for sock in list(_spectators):
+            _forget(sock)
+        return []
+
+    broadcast_to_spectators(_STOP)
+    _thread.join()
+    _wakeup_reader.close()
+    _wakeup_writer.close()
+    _wakeup_reader = None
+    _wakeup_writer = None
+    _thread = None
+    joiners, _joiners = _joiners, []
+    return joiners